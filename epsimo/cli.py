@@ -2,9 +2,12 @@ import argparse
 import sys
 import os
 import json
+import time
 import yaml
 from .client import EpsimoClient
 from .auth import login_interactive, get_token
+from .config import AssistantConfig, ConfigError, load_config
+from .deploy import DeployState, FileWatcher, deploy_many, deploy_project, resolve_targets, summarize
 
 def cmd_whoami(args):
     """Show current user info."""
@@ -210,19 +213,16 @@ def cmd_init(args):
         return
 
     # 3. Generate epsimo.yaml
+    assistant = AssistantConfig(
+        "default-assistant",
+        model="gpt-4o",
+        instructions="You are a helpful AI assistant created via the Epsimo CLI.",
+        tools=[{"type": "retrieval"}],
+    )
     config = {
         "project_id": project_id,
         "name": project_name,
-        "assistants": [
-            {
-                "name": "default-assistant",
-                "model": "gpt-4o",
-                "instructions": "You are a helpful AI assistant created via the Epsimo CLI.",
-                "tools": [
-                    {"type": "retrieval"}
-                ]
-            }
-        ]
+        "assistants": [assistant.to_dict()],
     }
     
     try:
@@ -236,25 +236,77 @@ def cmd_init(args):
     except Exception as e:
         print(f"❌ Failed to write epsimo.yaml: {e}")
 
-def cmd_deploy(args):
-    """Deploy configuration from epsimo.yaml to the platform."""
-    print("🚀 Deploying configuration...")
-    
+def _load_deploy_targets(args):
+    """Load epsimo.yaml and resolve deploy targets; returns (targets, multi, tool_files) or None after printing the error."""
     if not os.path.exists("epsimo.yaml"):
         print("❌ epsimo.yaml not found. Run 'epsimo init' first.")
-        return
+        return None
 
-    # 1. Load config
+    # 1. Load config (compiled form is cached by mtime and content hash)
     try:
-        with open("epsimo.yaml", "r") as f:
-            config = yaml.safe_load(f)
+        config = load_config()
+    except ConfigError as e:
+        print(f"❌ Invalid epsimo.yaml: {e}")
+        return None
     except Exception as e:
         print(f"❌ Failed to load epsimo.yaml: {e}")
-        return
+        return None
 
-    project_id = config.get("project_id")
-    if not project_id:
+    try:
+        project_ids = _parse_project_list(args.projects)
+        targets = resolve_targets(config, environments=args.env, project_ids=project_ids)
+    except Exception as e:
+        print(f"❌ {e}")
+        return None
+    multi = bool(args.env or project_ids)
+    if not multi and not targets[0]["project_id"]:
         print("❌ project_id missing in epsimo.yaml")
+        return None
+    return targets, multi, config.tool_files
+
+def _deploy_single(client, target, args, state):
+    """Plan and apply epsimo.yaml for one project, printing the plan."""
+    # 3. Plan: compare desired payloads with the remote assistants
+    assistants_config = target["assistants"]
+    print(f"📦 Found {len(assistants_config)} assistants in config.")
+
+    def show_plan(actions, source, drift):
+        for item in drift:
+            print(f"⚠️  Drift: {item['name']} was {item['drift']} outside of epsimo deploy.")
+        counts = summarize(actions)
+        origin = "from .epsimo/state.json" if source == "state" else "from the platform"
+        print(f"Plan ({origin}): {counts['create']} to create, {counts['update']} to update, {counts['noop']} unchanged.")
+        for action in actions:
+            if action["action"] != "noop":
+                symbol = "+" if action["action"] == "create" else "~"
+                print(f"   {symbol} {action['name']}")
+
+    try:
+        report = deploy_project(client, target["project_id"], assistants_config, state=state, refresh=args.refresh,
+                                dry_run=args.dry_run, concurrency=args.concurrency, on_plan=show_plan,
+                                verify=args.verify)
+        if args.dry_run:
+            print("ℹ️  Dry run: nothing was changed.")
+            return
+        state.save()
+        if report["replanned"]:
+            print("ℹ️  .epsimo/state.json was stale; re-planned from the platform.")
+
+        for result in report["failed"]:
+            print(f"❌ {result['action'].capitalize()} {result['name']} failed: {result['error']}")
+        if report["failed"]:
+            print(f"⚠️  Deployment finished with {len(report['failed'])} error(s) in {report['seconds']:.2f}s.")
+        else:
+            print(f"✅ Deployment complete in {report['seconds']:.2f}s!")
+
+    except Exception as e:
+        print(f"❌ Deployment failed: {e}")
+
+def cmd_deploy(args):
+    """Deploy configuration from epsimo.yaml to the platform."""
+    print("🚀 Deploying configuration...")
+    loaded = _load_deploy_targets(args)
+    if loaded is None and not args.watch:
         return
 
     # 2. Auth & Client
@@ -265,73 +317,152 @@ def cmd_deploy(args):
         print(f"❌ Auth failed: {e}")
         return
 
-    # 3. Process Assistants
-    assistants_config = config.get("assistants", [])
-    print(f"📦 Found {len(assistants_config)} assistants in config.")
-    
+    state = DeployState()
+    tool_files = []
+    if loaded is not None:
+        targets, multi, tool_files = loaded
+        if multi:
+            _deploy_targets(client, targets, args, state)
+        else:
+            _deploy_single(client, targets[0], args, state)
+    if not args.watch:
+        return
+
+    # Watch mode: redeploy on every settled change, over the same warm client.
+    # Plans come from the in-memory state, so only changed assistants are sent.
+    args.refresh = False
+    watcher = FileWatcher(["epsimo.yaml"] + tool_files)
+    print(f"👀 Watching {len(watcher.paths)} file(s) for changes (Ctrl+C to stop)...")
     try:
-        # Fetch current assistants to match by name
-        current_assistants = client.assistants.list(project_id)
-        asst_map = {a["name"]: a for a in current_assistants}
-        
-        for asst_cfg in assistants_config:
-            name = asst_cfg.get("name")
-            if not name: continue
-            
-            model = asst_cfg.get("model", "gpt-4o")
-            instructions = asst_cfg.get("instructions", "")
-            tools = asst_cfg.get("tools", [])
-            
-            if name in asst_map:
-                asst_id = asst_map[name]["assistant_id"]
-                print(f"🔄 Updating assistant: {name} ({asst_id})...")
-                client.assistants.update(project_id, asst_id, {
-                    "name": name,
-                    "config": {
-                        "configurable": {
-                            "type": "agent",
-                            "type==agent/model": model,
-                            "type==agent/system_message": instructions,
-                            "type==agent/tools": tools
-                        }
-                    }
-                })
+        while True:
+            changed = watcher.wait()
+            started = time.monotonic()
+            print(f"\n🔁 Changed: {', '.join(changed)}")
+            loaded = _load_deploy_targets(args)
+            if loaded is None:
+                continue
+            targets, multi, tool_files = loaded
+            watcher.watch(["epsimo.yaml"] + tool_files)
+            if multi:
+                _deploy_targets(client, targets, args, state)
             else:
-                print(f"✨ Creating assistant: {name}...")
-                client.assistants.create(
-                    project_id=project_id,
-                    name=name,
-                    model=model,
-                    instructions=instructions,
-                    tools=tools
-                )
-        
-        print("✅ Deployment complete!")
-        
-    except Exception as e:
-        print(f"❌ Deployment failed: {e}")
+                _deploy_single(client, targets[0], args, state)
+            print(f"⏱️  Change live {time.monotonic() - started:.2f}s after it settled.")
+    except KeyboardInterrupt:
+        print("\n👋 Stopped watching.")
+
+def _parse_project_list(value):
+    """Project ids from 'p1,p2' or '@file' (one id per line)."""
+    if not value:
+        return []
+    if value.startswith("@"):
+        with open(value[1:], "r") as f:
+            return [line.strip() for line in f if line.strip() and not line.startswith("#")]
+    return [p.strip() for p in value.split(",") if p.strip()]
+
+def _deploy_targets(client, targets, args, state):
+    """Deploy to several projects at once and print a consolidated report."""
+    print(f"🌍 Deploying to {len(targets)} projects ({args.project_concurrency} at a time)...")
+
+    def show_report(report):
+        counts = report["counts"]
+        if report["error"]:
+            print(f"   ❌ {report['target']} ({report['project_id']}): {report['error']}")
+        else:
+            mark = "❌" if report["failed"] else "✅"
+            print(f"   {mark} {report['target']} ({report['project_id']}): {counts['create']} created, "
+                  f"{counts['update']} updated, {counts['noop']} unchanged in {report['seconds']:.2f}s")
+
+    started = time.monotonic()
+    reports = deploy_many(client, targets, state=state, project_concurrency=args.project_concurrency,
+                          concurrency=args.concurrency, refresh=args.refresh, dry_run=args.dry_run,
+                          on_report=show_report, verify=args.verify)
+    if not args.dry_run:
+        state.save()
+
+    totals = {"create": 0, "update": 0, "noop": 0}
+    for report in reports:
+        for action, count in report["counts"].items():
+            totals[action] += count
+    failed_projects = [r for r in reports if r["error"] or r["failed"]]
+    drifted = sum(len(r["drift"]) for r in reports)
+    if args.dry_run:
+        print(f"\n📊 Planned {len(reports)} projects in {time.monotonic() - started:.2f}s: "
+              f"{totals['create']} to create, {totals['update']} to update, {totals['noop']} unchanged.")
+    else:
+        print(f"\n📊 Deployed {len(reports)} projects in {time.monotonic() - started:.2f}s: "
+              f"{totals['create']} created, {totals['update']} updated, {totals['noop']} unchanged.")
+    if drifted:
+        print(f"⚠️  {drifted} assistant(s) drifted outside of epsimo deploy.")
+    for report in failed_projects:
+        for result in report["failed"]:
+            print(f"❌ {report['target']}: {result['action']} {result['name']} failed: {result['error']}")
+    if failed_projects:
+        print(f"⚠️  {len(failed_projects)} project(s) with errors.")
+
+    if args.report:
+        summary = [{
+            "target": r["target"], "project_id": r["project_id"], "error": r["error"],
+            "seconds": r["seconds"], "counts": r["counts"], "drift": r["drift"],
+            "results": [{k: v for k, v in result.items() if k != "payload"} for result in r.get("results", [])],
+        } for r in reports]
+        with open(args.report, "w") as f:
+            json.dump(summary, f, indent=2, default=str)
+        print(f"🗒️  Report written to {args.report}")
+
+def _write_json(value, out, indent=None):
+    """Write a JSON value in chunks instead of building one big string."""
+    separators = (",", ": ") if indent else (",", ":")
+    for chunk in json.JSONEncoder(indent=indent, separators=separators, ensure_ascii=False, default=str).iterencode(value):
+        out.write(chunk)
 
 def cmd_db(args):
     """Query the structured state (virtual database) of a thread."""
-    print(f"📊 Querying Virtual Database for thread {args.thread_id}...")
+    out = sys.stdout
+    if not args.ndjson:
+        print(f"📊 Querying Virtual Database for thread {args.thread_id}...")
     try:
         token = get_token()
         client = EpsimoClient(api_key=token)
-        state = client.threads.get_state(args.project_id, args.thread_id)
-        
-        # The state typically has 'values' which is our DB
-        values = state.get("values", {})
-        
-        if not values:
-            print("📭 Database is empty.")
+
+        if args.path:
+            matches = client.db.query(args.project_id, args.thread_id, args.path,
+                                      include_messages=args.include_messages)
+        else:
+            values = client.db.get_all(args.project_id, args.thread_id)
+            if not args.include_messages:
+                values.pop("messages", None)
+            if not values and not args.ndjson:
+                print("📭 Database is empty.")
+                return
+            matches = ({"key": k, "value": v} for k, v in values.items()) if args.ndjson else None
+
+        if args.ndjson:
+            for item in matches:
+                _write_json(item, out)
+                out.write("\n")
+            out.flush()
             return
-            
+
         print("\n=== Current State (JSON) ===")
-        print(json.dumps(values, indent=2))
-        print("============================\n")
-            
+        if matches is None:
+            _write_json(values, out, indent=2)
+        else:
+            # Stream matches as a JSON array without collecting them first.
+            out.write("[")
+            count = 0
+            for item in matches:
+                out.write(",\n  " if count else "\n  ")
+                _write_json(item, out)
+                count += 1
+            out.write("\n]" if count else "]")
+        print("\n============================\n")
+
     except Exception as e:
-        print(f"❌ Failed to query database: {e}")
+        if args.ndjson:
+            print(json.dumps({"error": str(e)}))
+        else:
+            print(f"❌ Failed to query database: {e}")
 
 def cmd_db_set(args):
     """Set a value in the thread's virtual database."""
@@ -345,12 +476,280 @@ def cmd_db_set(args):
             
         token = get_token()
         client = EpsimoClient(api_key=token)
-        client.threads.set_state(args.project_id, args.thread_id, {args.key: val})
+        if args.ttl:
+            client.db.set(args.project_id, args.thread_id, args.key, val, ttl=args.ttl)
+        else:
+            client.threads.set_state(args.project_id, args.thread_id, {args.key: val})
         print("✅ State updated successfully.")
             
     except Exception as e:
         print(f"❌ Failed to update database: {e}")
 
+def cmd_db_patch(args):
+    """Write only the keys that differ from the thread's current state."""
+    try:
+        if args.data.startswith("@"):
+            with open(args.data[1:], "r") as f:
+                data = json.load(f)
+        else:
+            data = json.loads(args.data)
+        if not isinstance(data, dict):
+            print("❌ --data must be a JSON object.")
+            return
+
+        token = get_token()
+        client = EpsimoClient(api_key=token)
+        changes = client.db.patch(args.project_id, args.thread_id, data, delete_missing=args.delete_missing)
+        if not changes:
+            print("✅ Nothing to update (state already matches).")
+            return
+        print(f"✅ Updated {len(changes)} key(s): {', '.join(changes)}")
+        if len(changes) < len(data):
+            print(f"ℹ️  Skipped {len(data) - len(changes)} unchanged key(s).")
+
+    except Exception as e:
+        print(f"❌ Failed to patch database: {e}")
+
+def _parse_where(expr):
+    """Parse 'path=value', 'path>=value', 'path^=prefix'... into (path, condition)."""
+    for token, op in ((">=", "gte"), ("<=", "lte"), ("^=", "prefix"), (">", "gt"), ("<", "lt"), ("=", "eq")):
+        if token in expr:
+            path, raw = expr.split(token, 1)
+            try:
+                value = json.loads(raw)
+            except ValueError:
+                value = raw
+            if op == "prefix":
+                value = str(value)
+            return path.strip(), {op: value}
+    raise ValueError(f"Invalid condition '{expr}' (expected e.g. status=active or score>=5)")
+
+def cmd_db_find(args):
+    """Find threads by indexed state values."""
+    try:
+        where = {}
+        for expr in args.where or []:
+            path, condition = _parse_where(expr)
+            where.setdefault(path, {}).update(condition)
+
+        token = get_token()
+        client = EpsimoClient(api_key=token)
+        paths = args.index or None
+        index = client.db.index(args.project_id, paths=paths, path=args.index_file)
+        if set(where) - set(index.paths):
+            # Extend the index with the --where paths (their threads are re-read once).
+            paths = sorted(set(index.paths) | set(where))
+            index.close()
+            index = client.db.index(args.project_id, paths=paths, path=args.index_file)
+
+        with index:
+            if not args.no_refresh:
+                stats = index.refresh(full=args.full)
+                if not args.json:
+                    print(f"🔎 Index refreshed: {stats['updated']} of {stats['scanned']} threads re-read, {stats['removed']} removed.")
+            if not where:
+                if not args.json:
+                    print(f"Indexed paths: {', '.join(index.paths)}")
+                return
+            thread_ids = index.find(where)
+
+            if args.json:
+                print(json.dumps(thread_ids))
+                return
+            if not thread_ids:
+                print("No matching threads.")
+                return
+            for thread_id in thread_ids:
+                print(thread_id)
+
+    except Exception as e:
+        if args.json:
+            print(json.dumps({"error": str(e)}))
+        else:
+            print(f"❌ Failed to search database: {e}")
+
+def cmd_db_export(args):
+    """Export every thread state of a project."""
+    print(f"📦 Exporting Virtual Database of project {args.project_id} to {args.output}...")
+    try:
+        token = get_token()
+        client = EpsimoClient(api_key=token, rate_limit=args.rate)
+
+        def progress(done, total):
+            sys.stdout.write(f"\r   {done}/{total} threads")
+            sys.stdout.flush()
+
+        result = client.db.export_project(
+            args.project_id, args.output, format=args.format,
+            concurrency=args.concurrency, resume=args.resume, on_progress=progress
+        )
+        print(f"\n✅ Exported {result['exported']} threads" +
+              (f" ({result['skipped']} already exported)." if result["skipped"] else "."))
+    except Exception as e:
+        print(f"\n❌ Export failed: {e}")
+        if args.format != "parquet":
+            print("ℹ️  Re-run with --resume to continue from the last checkpoint.")
+
+def cmd_db_import(args):
+    """Import thread states from an export file."""
+    print(f"📥 Importing {args.input} into project {args.project_id}...")
+    try:
+        token = get_token()
+        client = EpsimoClient(api_key=token, rate_limit=args.rate)
+
+        def progress(done):
+            sys.stdout.write(f"\r   {done} threads")
+            sys.stdout.flush()
+
+        result = client.db.import_project(
+            args.project_id, args.input, format=args.format,
+            concurrency=args.concurrency, assistant_id=args.assistant_id, resume=args.resume,
+            on_progress=progress
+        )
+        print(f"\n✅ Imported {result['imported']} threads" +
+              (f" ({result['skipped']} already imported)." if result["skipped"] else "."))
+        for thread_id, error in result["failed"].items():
+            print(f"⚠️  {thread_id}: {error}")
+        if result["failed"]:
+            print(f"ℹ️  {len(result['failed'])} threads failed; re-run with --resume to retry them.")
+        if args.assistant_id and args.mapping:
+            with open(args.mapping, "w") as f:
+                json.dump(result["threads"], f, indent=2)
+            print(f"🗺️  Thread id mapping written to {args.mapping}")
+    except Exception as e:
+        print(f"\n❌ Import failed: {e}")
+        print("ℹ️  Re-run with --resume to continue from the last checkpoint.")
+
+def cmd_files_upload(args):
+    """Upload files (or a whole directory) to an assistant in parallel."""
+    paths = list(args.paths or []) + ([args.dir] if args.dir else [])
+    if not paths:
+        print("❌ Give files to upload or --dir.")
+        return
+    print(f"📤 Uploading to assistant {args.assistant_id} ({args.concurrency} at a time)...")
+    try:
+        token = get_token()
+        client = EpsimoClient(api_key=token, rate_limit=args.rate)
+
+        def progress(files_done, files_total, sent, total):
+            mb = 1024 * 1024
+            sys.stdout.write(f"\r   {files_done}/{files_total} files, {sent / mb:.1f}/{total / mb:.1f} MB")
+            sys.stdout.flush()
+
+        manifest = client.files.upload_many(
+            args.project_id, args.assistant_id, paths,
+            concurrency=args.concurrency, retries=args.retries, on_progress=progress, dedup=args.dedup,
+            resumable_over=8 * 1024 * 1024 if args.resumable else None
+        )
+        seconds = manifest["seconds"] or 1e-9
+        print(f"\n✅ Uploaded {manifest['uploaded']} files "
+              f"({manifest['bytes'] / 1024 / 1024:.1f} MB, {manifest['bytes'] / 1024 / 1024 / seconds:.1f} MB/s).")
+        if manifest["skipped"]:
+            print(f"⏭️  Skipped {manifest['skipped']} files already attached (same content).")
+        for result in manifest["results"]:
+            if result["status"] == "failed":
+                print(f"❌ {result['path']}: {result['error']}")
+        if args.manifest:
+            with open(args.manifest, "w") as f:
+                json.dump(manifest, f, indent=2)
+            print(f"🗒️  Results written to {args.manifest}")
+    except Exception as e:
+        print(f"\n❌ Upload failed: {e}")
+
+def cmd_files_sync(args):
+    """Mirror a local directory into an assistant's files."""
+    print(f"🔄 Syncing {args.dir} with assistant {args.assistant_id}...")
+    try:
+        token = get_token()
+        client = EpsimoClient(api_key=token, rate_limit=args.rate)
+
+        def progress(files_done, files_total, sent, total):
+            sys.stdout.write(f"\r   {files_done}/{files_total} files, {sent / 1024 / 1024:.1f}/{total / 1024 / 1024:.1f} MB")
+            sys.stdout.flush()
+
+        def show_plan(plan):
+            print(f"Plan: {len(plan['upload'])} new, {len(plan['update'])} changed, "
+                  f"{len(plan['delete'])} to delete, {plan['unchanged']} unchanged.")
+            for name in plan["upload"]:
+                print(f"   + {name}")
+            for name in plan["update"]:
+                print(f"   ~ {name}")
+            for entry in plan["delete"]:
+                print(f"   - {entry['name'] or entry['file_id']}")
+
+        plan = client.files.sync(args.project_id, args.assistant_id, args.dir, concurrency=args.concurrency,
+                                 prune=args.prune, dry_run=args.dry_run, on_progress=progress, on_plan=show_plan)
+        if args.dry_run:
+            print("ℹ️  Dry run: nothing was changed.")
+            return
+
+        result = plan["result"]
+        if result["results"]:
+            print()
+        print(f"✅ Uploaded {result['uploaded']} files, deleted {len(plan['deleted'])} in {result['seconds']:.1f}s.")
+        for entry in result["results"]:
+            if entry["status"] == "failed":
+                print(f"❌ {entry['path']}: {entry['error']}")
+        for entry in plan["delete_errors"]:
+            print(f"❌ delete {entry['file_id']}: {entry['error']}")
+    except Exception as e:
+        print(f"\n❌ Sync failed: {e}")
+
+def _parse_time(value):
+    """Parse epoch seconds or an ISO 8601 date/time (local time when no offset is given)."""
+    try:
+        return float(value)
+    except ValueError:
+        from datetime import datetime
+        return datetime.fromisoformat(value).timestamp()
+
+def cmd_db_history(args):
+    """Show the locally recorded change history of a thread."""
+    try:
+        token = get_token()
+        client = EpsimoClient(api_key=token)
+        client.db.enable_history(args.history_dir)
+        if args.snapshot:
+            entry = client.db.snapshot(args.project_id, args.thread_id)
+            print("📸 Snapshot recorded." if entry else "📸 No changes since the last snapshot.")
+
+        from datetime import datetime
+        count = 0
+        for entry in client.db.history.entries(args.thread_id, since=_parse_time(args.since) if args.since else None):
+            when = datetime.fromtimestamp(entry["t"]).isoformat(timespec="seconds")
+            if entry["type"] == "checkpoint":
+                print(f"{when}  checkpoint  {len(entry['values'])} keys")
+            else:
+                changed = ", ".join(list(entry["set"]) + [f"-{k}" for k in entry["removed"]])
+                print(f"{when}  delta       {changed}")
+            count += 1
+        if not count:
+            print("📭 No history recorded for this thread. Use --snapshot to record the current state.")
+
+    except Exception as e:
+        print(f"❌ Failed to read history: {e}")
+
+def cmd_db_restore(args):
+    """Roll a thread's state back to a recorded point in time."""
+    try:
+        timestamp = _parse_time(args.at)
+        token = get_token()
+        client = EpsimoClient(api_key=token)
+        client.db.enable_history(args.history_dir)
+        values = client.db.state_at(args.thread_id, timestamp)
+        if values is None:
+            print("❌ No history recorded for this thread at that time.")
+            return
+        if args.dry_run:
+            changes = client.db.restore(args.project_id, args.thread_id, timestamp, dry_run=True)
+            print(json.dumps(changes, indent=2))
+            return
+        changes = client.db.restore(args.project_id, args.thread_id, timestamp)
+        print(f"✅ Restored {len(changes)} key(s)." if changes else "✅ State already matches that point in time.")
+
+    except Exception as e:
+        print(f"❌ Failed to restore state: {e}")
+
 def cmd_create(args):
     """Scaffold a new Epsimo MVP project."""
     project_name = args.name
@@ -510,6 +909,17 @@ def main():
 
     # epsimo deploy
     deploy_parser = subparsers.add_parser("deploy", help="Deploy config from epsimo.yaml")
+    deploy_parser.add_argument("--dry-run", action="store_true", help="Only print the plan")
+    deploy_parser.add_argument("--concurrency", type=int, default=8, help="Parallel creates/updates")
+    deploy_parser.add_argument("--refresh", action="store_true",
+                               help="Re-read assistants from the platform instead of .epsimo/state.json (reports drift)")
+    deploy_parser.add_argument("--verify", action="store_true",
+                               help="Check .epsimo/state.json against the platform first (one listing per project) and re-plan on drift")
+    deploy_parser.add_argument("--env", action="append", help="Deploy an environment from 'environments:' (repeatable)")
+    deploy_parser.add_argument("--projects", help="Deploy to these projects (instead of project_id): 'p1,p2' or @file with one id per line")
+    deploy_parser.add_argument("--project-concurrency", type=int, default=4, help="Projects deployed in parallel")
+    deploy_parser.add_argument("--report", help="Write a JSON report of a multi-project deploy to this path")
+    deploy_parser.add_argument("--watch", action="store_true", help="Redeploy changed assistants whenever epsimo.yaml or a tool file changes")
     deploy_parser.set_defaults(func=cmd_deploy)
 
     # epsimo create
@@ -559,6 +969,33 @@ def main():
     run_parser.add_argument("--assistant-id", required=True, help="Assistant ID")
     run_parser.set_defaults(func=cmd_run)
 
+    # epsimo files upload --project-id X --assistant-id Y --dir docs/
+    files_parser = subparsers.add_parser("files", help="Manage assistant files")
+    files_subparsers = files_parser.add_subparsers(dest="files_command", help="Files command")
+
+    upload_parser = files_subparsers.add_parser("upload", help="Upload files to an assistant")
+    upload_parser.add_argument("paths", nargs="*", help="Files or directories to upload")
+    upload_parser.add_argument("--project-id", required=True, help="Project ID")
+    upload_parser.add_argument("--assistant-id", required=True, help="Assistant ID")
+    upload_parser.add_argument("--dir", help="Upload every file of this directory (recursively)")
+    upload_parser.add_argument("--concurrency", type=int, default=4, help="Parallel uploads")
+    upload_parser.add_argument("--rate", type=float, help="Max API requests per second")
+    upload_parser.add_argument("--retries", type=int, default=3, help="Retries per file on network/server errors")
+    upload_parser.add_argument("--manifest", help="Write the per-file results (JSON) to this path")
+    upload_parser.add_argument("--dedup", action="store_true", help="Skip files whose content is already attached")
+    upload_parser.add_argument("--resumable", action="store_true", help="Upload files over 8 MB in resumable chunks")
+    upload_parser.set_defaults(func=cmd_files_upload)
+
+    sync_parser = files_subparsers.add_parser("sync", help="Mirror a local directory into an assistant's files")
+    sync_parser.add_argument("--project-id", required=True, help="Project ID")
+    sync_parser.add_argument("--assistant-id", required=True, help="Assistant ID")
+    sync_parser.add_argument("--dir", required=True, help="Local directory to mirror")
+    sync_parser.add_argument("--concurrency", type=int, default=4, help="Parallel uploads/deletes")
+    sync_parser.add_argument("--rate", type=float, help="Max API requests per second")
+    sync_parser.add_argument("--prune", action="store_true", help="Also delete remote files not found locally")
+    sync_parser.add_argument("--dry-run", action="store_true", help="Only print the plan")
+    sync_parser.set_defaults(func=cmd_files_sync)
+
     # epsimo db query --project-id X --thread-id Y
     db_parser = subparsers.add_parser("db", help="Manage Virtual Database state")
     db_subparsers = db_parser.add_subparsers(dest="db_command", help="DB command")
@@ -566,6 +1003,9 @@ def main():
     query_parser = db_subparsers.add_parser("query", help="Query the current state of a thread")
     query_parser.add_argument("--project-id", required=True, help="Project ID")
     query_parser.add_argument("--thread-id", required=True, help="Thread ID")
+    query_parser.add_argument("--path", help="Only output values matching a path, e.g. 'orders[*].total'")
+    query_parser.add_argument("--ndjson", action="store_true", help="Stream one compact JSON document per line")
+    query_parser.add_argument("--include-messages", action="store_true", help="Include the message history")
     query_parser.set_defaults(func=cmd_db)
 
     set_parser = db_subparsers.add_parser("set", help="Set a value in the thread state")
@@ -573,8 +1013,62 @@ def main():
     set_parser.add_argument("--thread-id", required=True, help="Thread ID")
     set_parser.add_argument("--key", required=True, help="Key to set")
     set_parser.add_argument("--value", required=True, help="Value to set (JSON strings supported)")
+    set_parser.add_argument("--ttl", type=float, help="Expire the key after this many seconds")
     set_parser.set_defaults(func=cmd_db_set)
 
+    patch_parser = db_subparsers.add_parser("patch", help="Send only the keys that changed")
+    patch_parser.add_argument("--project-id", required=True, help="Project ID")
+    patch_parser.add_argument("--thread-id", required=True, help="Thread ID")
+    patch_parser.add_argument("--data", required=True, help="JSON object, or @file.json")
+    patch_parser.add_argument("--delete-missing", action="store_true", help="Set keys absent from --data to null")
+    patch_parser.set_defaults(func=cmd_db_patch)
+
+    find_parser = db_subparsers.add_parser("find", help="Find threads by state values (local index)")
+    find_parser.add_argument("--project-id", required=True, help="Project ID")
+    find_parser.add_argument("--where", action="append", help="Condition: path=value, path>=n, path<n, path^=prefix (repeatable)")
+    find_parser.add_argument("--index", action="append", help="Key path to index (repeatable; defaults to the --where paths)")
+    find_parser.add_argument("--index-file", help="SQLite index file (default: .epsimo/index/<project_id>.sqlite)")
+    find_parser.add_argument("--no-refresh", action="store_true", help="Query the index without crawling changed threads")
+    find_parser.add_argument("--full", action="store_true", help="Re-read every thread")
+    find_parser.add_argument("--json", action="store_true", help="Output as JSON")
+    find_parser.set_defaults(func=cmd_db_find)
+
+    export_parser = db_subparsers.add_parser("export", help="Export all thread states of a project")
+    export_parser.add_argument("--project-id", required=True, help="Project ID")
+    export_parser.add_argument("--output", required=True, help="Output file (.jsonl, .jsonl.gz or .parquet)")
+    export_parser.add_argument("--format", choices=["jsonl", "parquet"], help="Output format (default: from extension)")
+    export_parser.add_argument("--concurrency", type=int, default=8, help="Parallel state fetches")
+    export_parser.add_argument("--rate", type=float, help="Max requests per second")
+    export_parser.add_argument("--resume", action="store_true", help="Continue an interrupted JSONL export")
+    export_parser.set_defaults(func=cmd_db_export)
+
+    import_parser = db_subparsers.add_parser("import", help="Import thread states from an export file")
+    import_parser.add_argument("--project-id", required=True, help="Project ID")
+    import_parser.add_argument("--input", required=True, help="Export file (.jsonl, .jsonl.gz or .parquet)")
+    import_parser.add_argument("--format", choices=["jsonl", "parquet"], help="Input format (default: from extension)")
+    import_parser.add_argument("--concurrency", type=int, default=8, help="Parallel state writes")
+    import_parser.add_argument("--rate", type=float, help="Max requests per second")
+    import_parser.add_argument("--assistant-id", help="Create new threads for this assistant instead of writing to the original ids")
+    import_parser.add_argument("--mapping", help="With --assistant-id, write the old->new thread id map to this file")
+    import_parser.add_argument("--resume", action="store_true", help="Skip threads an interrupted import already wrote")
+    import_parser.set_defaults(func=cmd_db_import)
+
+    history_parser = db_subparsers.add_parser("history", help="Show the local change history of a thread")
+    history_parser.add_argument("--project-id", required=True, help="Project ID")
+    history_parser.add_argument("--thread-id", required=True, help="Thread ID")
+    history_parser.add_argument("--snapshot", action="store_true", help="Record the current state first")
+    history_parser.add_argument("--since", help="Only show entries after this time (ISO 8601 or epoch)")
+    history_parser.add_argument("--history-dir", help="History directory (default: .epsimo/history)")
+    history_parser.set_defaults(func=cmd_db_history)
+
+    restore_parser = db_subparsers.add_parser("restore", help="Restore a thread's state from local history")
+    restore_parser.add_argument("--project-id", required=True, help="Project ID")
+    restore_parser.add_argument("--thread-id", required=True, help="Thread ID")
+    restore_parser.add_argument("--at", required=True, help="Point in time (ISO 8601 or epoch)")
+    restore_parser.add_argument("--dry-run", action="store_true", help="Show the changes without writing them")
+    restore_parser.add_argument("--history-dir", help="History directory (default: .epsimo/history)")
+    restore_parser.set_defaults(func=cmd_db_restore)
+
     args = parser.parse_args()
     
     if hasattr(args, "func"):
@@ -1,4 +1,6 @@
 import os
+import threading
+import time
 import requests
 from .resources.projects import Projects
 from .resources.assistants import Assistants
@@ -6,9 +8,11 @@ from .resources.threads import Threads
 from .resources.files import Files
 from .resources.credits import Credits
 from .resources.db import Database
+from .metrics import Metrics
+from .ratelimit import RateLimiter
 
 class EpsimoClient:
-    def __init__(self, api_key=None, base_url=None):
+    def __init__(self, api_key=None, base_url=None, rate_limit=None, token_ttl=300):
         self.api_key = api_key or os.environ.get("EPSIMO_API_KEY")
         self.base_url = base_url or os.environ.get("EPSIMO_API_URL", "https://api.epsimoagents.com")
         
@@ -16,8 +20,22 @@ class EpsimoClient:
         # For now, we reuse the JWT token logic but wrapped cleanly.
         # If the user passes a token as api_key, we use it.
         self._session = requests.Session()
+        # Room for the worker pools of bulk operations (uploads, exports, multi-project deploys)
+        adapter = requests.adapters.HTTPAdapter(pool_maxsize=32)
+        self._session.mount("https://", adapter)
+        self._session.mount("http://", adapter)
         if self.api_key:
             self._session.headers.update({"Authorization": f"Bearer {self.api_key}"})
+
+        self.metrics = Metrics()
+        # Optional client-wide cap on requests per second
+        self.rate_limiter = RateLimiter(rate_limit) if rate_limit else None
+        # Project tokens are reused for `token_ttl` seconds instead of being fetched per call
+        self.token_ttl = token_ttl
+        self._project_tokens = {}
+        self._token_lock = threading.Lock()  # guards the cache only, never held during a request
+        self._fetch_locks = {}  # project_id -> lock serializing that project's token fetch
+        self._token_generation = 0
             
         self.projects = Projects(self)
         self.assistants = Assistants(self)
@@ -27,27 +45,78 @@ class EpsimoClient:
         self.db = Database(self)
 
     def request(self, method, path, **kwargs):
+        response = self.request_raw(method, path, **kwargs)
+        if response.status_code == 204:
+            return None
+        return response.json()
+
+    def request_raw(self, method, path, allow_status=(), **kwargs):
+        """
+        Send a request and return the raw response (headers, status) after error handling.
+        Statuses in `allow_status` are returned to the caller instead of being reported as errors.
+        """
         url = f"{self.base_url}{path}"
+        if self.rate_limiter is not None:
+            waited = self.rate_limiter.acquire()
+            if waited:
+                self.metrics.incr("http.throttled_seconds", waited)
+        self.metrics.incr("http.requests")
         response = self._session.request(method, url, **kwargs)
-        if not response.ok:
+        if response.status_code == 401:
+            # A cached project token may have expired; fetch fresh ones next time.
+            self.forget_project_token()
+        if not response.ok and response.status_code not in allow_status:
             try:
                 import json
                 print(f"❌ API Error ({response.status_code}): {json.dumps(response.json(), indent=2)}")
             except:
                 print(f"❌ API Error ({response.status_code}): {response.text}")
             response.raise_for_status()
-        if response.status_code == 204:
-            return None
-        return response.json()
+        return response
 
     def get_project_headers(self, project_id):
         """Fetch/Construct headers including project-specific token."""
-        # Using the clean client.projects access
-        resp = self.projects.get(project_id)
-        token = resp.get("access_token") or resp.get("token") or resp.get("jwt_token")
-        
-        if not token:
-             # Just a warning or error?
-             print(f"Warning: No specific token found for project {project_id}")
-             
+        cached = self._cached_project_token(project_id)
+        if cached is not None:
+            return {"Authorization": f"Bearer {cached}"}
+
+        # One fetch per project at a time; other projects fetch in parallel.
+        with self._token_lock:
+            fetch_lock = self._fetch_locks.setdefault(project_id, threading.Lock())
+        with fetch_lock:
+            cached = self._cached_project_token(project_id)  # fetched while we waited
+            if cached is not None:
+                return {"Authorization": f"Bearer {cached}"}
+
+            generation = self._token_generation
+            # Using the clean client.projects access
+            resp = self.projects.get(project_id)
+            token = resp.get("access_token") or resp.get("token") or resp.get("jwt_token")
+
+            if not token:
+                 # Just a warning or error?
+                 print(f"Warning: No specific token found for project {project_id}")
+            elif self.token_ttl:
+                with self._token_lock:
+                    # Tokens fetched before a 401 cleared the cache are not cached.
+                    if generation == self._token_generation:
+                        self._project_tokens[project_id] = (token, time.monotonic())
+
         return {"Authorization": f"Bearer {token}"}
+
+    def _cached_project_token(self, project_id):
+        with self._token_lock:
+            cached = self._project_tokens.get(project_id)
+            if cached is not None and time.monotonic() - cached[1] < self.token_ttl:
+                self.metrics.incr("http.token_cache_hits")
+                return cached[0]
+        return None
+
+    def forget_project_token(self, project_id=None):
+        """Drop the cached token of a project (or of all projects) so the next call fetches a new one."""
+        with self._token_lock:
+            self._token_generation += 1
+            if project_id is None:
+                self._project_tokens.clear()
+            else:
+                self._project_tokens.pop(project_id, None)
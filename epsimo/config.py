@@ -0,0 +1,309 @@
+import copy
+import hashlib
+import json
+import os
+import threading
+from collections import Counter
+
+import yaml
+
+CONFIG_FILE = "epsimo.yaml"
+DEFAULT_CACHE_PATH = os.path.join(".epsimo", "cache", "config.json")
+CACHE_VERSION = 2
+DEFAULT_MODEL = "gpt-4o"
+TOOL_FILE_KEY = "$file"
+
+# libyaml's loader is several times faster on large files; PyYAML ships without it on some platforms.
+Loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+# Allowed keys and their types. Unknown keys are rejected so typos fail loudly.
+PROJECT_SCHEMA = {"project_id": str, "name": str, "assistants": list, "environments": dict}
+ASSISTANT_SCHEMA = {"name": str, "model": str, "instructions": str, "tools": list, "public": bool}
+ENVIRONMENT_SCHEMA = {"project_id": str, "project_ids": list, "assistants": list}
+
+
+class ConfigError(ValueError):
+    pass
+
+
+def assistant_payload(name, model=DEFAULT_MODEL, instructions="", tools=None, public=None):
+    """
+    Create/update payload of an assistant; the only place the `configurable` keys are built.
+    `public` is only sent when set, so an update leaves the published flag alone otherwise.
+    """
+    payload = {
+        "name": name,
+        "config": {
+            "configurable": {
+                "type": "agent",
+                "type==agent/agent_type": "GPT-4O",  # legacy/specific key
+                "type==agent/model": model,
+                "type==agent/system_message": instructions,
+                "type==agent/tools": normalize_tools(tools),
+            }
+        },
+    }
+    if public is not None:
+        payload["public"] = public
+    return payload
+
+
+def normalize_tool(tool, where="tool"):
+    """A tool as the API expects it: a dict with a "type" (a bare string is shorthand for {"type": ...})."""
+    if isinstance(tool, str):
+        return {"type": tool}
+    if not isinstance(tool, dict):
+        raise ConfigError(f"{where}: expected a tool name or mapping, got {type(tool).__name__}")
+    if not isinstance(tool.get("type"), str) or not tool["type"]:
+        raise ConfigError(f"{where}: tool needs a 'type'")
+    return dict(tool)
+
+
+def normalize_tools(tools, where="tools"):
+    return [normalize_tool(tool, f"{where}[{i}]") for i, tool in enumerate(tools or [])]
+
+
+def _check(data, schema, where, required=()):
+    if not isinstance(data, dict):
+        raise ConfigError(f"{where}: expected a mapping, got {type(data).__name__}")
+    unknown = sorted(set(data) - set(schema))
+    if unknown:
+        raise ConfigError(f"{where}: unknown key(s) {', '.join(unknown)} (allowed: {', '.join(schema)})")
+    for key in required:
+        if data.get(key) in (None, ""):
+            raise ConfigError(f"{where}: '{key}' is required")
+    for key, expected in schema.items():
+        if data.get(key) is not None and not isinstance(data[key], expected):
+            raise ConfigError(f"{where}.{key}: expected {expected.__name__}, got {type(data[key]).__name__}")
+
+
+_tool_files = {}  # path -> ((mtime_ns, size), parsed content)
+_tool_files_lock = threading.Lock()
+
+
+def _load_tool_file(path):
+    stat = os.stat(path)
+    signature = (stat.st_mtime_ns, stat.st_size)
+    with _tool_files_lock:
+        cached = _tool_files.get(path)
+        if cached is not None and cached[0] == signature:
+            return copy.deepcopy(cached[1])
+    with open(path, "r", encoding="utf-8") as f:
+        content = yaml.load(f, Loader=Loader)  # YAML or JSON
+    with _tool_files_lock:
+        _tool_files[path] = (signature, content)
+    return copy.deepcopy(content)
+
+
+def _expand_tools(tools, base_dir, used, where):
+    """Inline `{"$file": path}` entries (one tool or a list per file) and normalize every tool."""
+    expanded = []
+    for i, tool in enumerate(tools or []):
+        if isinstance(tool, dict) and set(tool) == {TOOL_FILE_KEY}:
+            path = os.path.normpath(os.path.join(base_dir, tool[TOOL_FILE_KEY]))
+            used.add(path)
+            try:
+                content = _load_tool_file(path)
+            except OSError as e:
+                raise ConfigError(f"{where}[{i}]: cannot read {path}: {e.strerror}")
+            for j, item in enumerate(content if isinstance(content, list) else [content]):
+                expanded.append(normalize_tool(item, f"{path}[{j}]"))
+        else:
+            expanded.append(normalize_tool(tool, f"{where}[{i}]"))
+    return expanded
+
+
+class AssistantConfig:
+    """One assistant of epsimo.yaml, validated and with defaults applied (`public` stays None when unset)."""
+    def __init__(self, name, model=DEFAULT_MODEL, instructions="", tools=None, public=None):
+        self.name = name
+        self.model = model
+        self.instructions = instructions
+        self.tools = normalize_tools(tools, f"{name}.tools")
+        self.public = public
+
+    @classmethod
+    def from_dict(cls, data, where="assistant"):
+        _check(data, ASSISTANT_SCHEMA, where, required=("name",))
+        return cls(data["name"], model=data.get("model") or DEFAULT_MODEL,
+                   instructions=data.get("instructions") or "", tools=data.get("tools"),
+                   public=data.get("public"))
+
+    def payload(self):
+        return assistant_payload(self.name, self.model, self.instructions, self.tools, self.public)
+
+    def to_dict(self):
+        data = {"name": self.name, "model": self.model, "instructions": self.instructions, "tools": list(self.tools)}
+        if self.public is not None:
+            data["public"] = self.public
+        return data
+
+
+class ProjectConfig:
+    """
+    Compiled epsimo.yaml: assistants validated, tool files inlined, tools
+    normalized and environments expanded to full assistant lists
+    (overrides merged by name into the top-level assistants).
+    `tool_files` lists the tool files the config was built from.
+    """
+    def __init__(self, project_id=None, name=None, assistants=None, environments=None, tool_files=None):
+        self.project_id = project_id
+        self.name = name
+        self.assistants = assistants or []
+        self.environments = environments or {}
+        self.tool_files = tool_files or []
+
+    @classmethod
+    def from_dict(cls, data, base_dir="."):
+        """Validate and compile a parsed epsimo.yaml; raises ConfigError."""
+        data = data or {}
+        _check(data, PROJECT_SCHEMA, CONFIG_FILE)
+        used = set()
+
+        def assistants(entries, where, partial=False):
+            compiled = []
+            for i, entry in enumerate(entries or []):
+                at = f"{where}[{i}]"
+                _check(entry, ASSISTANT_SCHEMA, at, required=("name",))
+                entry = dict(entry)
+                if "tools" in entry:
+                    entry["tools"] = _expand_tools(entry["tools"], base_dir, used, f"{at}.tools")
+                compiled.append(entry if partial else AssistantConfig.from_dict(entry, at).to_dict())
+            duplicates = sorted(n for n, count in Counter(a["name"] for a in compiled).items() if count > 1)
+            if duplicates:
+                raise ConfigError(f"{where}: duplicate assistant name(s) {', '.join(duplicates)}")
+            return compiled
+
+        base = assistants(data.get("assistants"), "assistants")
+        environments = {}
+        for env_name, env in (data.get("environments") or {}).items():
+            where = f"environments.{env_name}"
+            env = env or {}
+            _check(env, ENVIRONMENT_SCHEMA, where)
+            overrides = assistants(env.get("assistants"), f"{where}.assistants", partial=True)
+            project_ids = env.get("project_ids") or [env.get("project_id") or data.get("project_id")]
+            environments[env_name] = {
+                "project_ids": project_ids,
+                "assistants": [AssistantConfig.from_dict(a, where).to_dict()
+                               for a in overlay_assistants(base, overrides)],
+            }
+        return cls._from_compiled({"project_id": data.get("project_id"), "name": data.get("name"),
+                                   "assistants": base, "environments": environments,
+                                   "tool_files": sorted(used)})
+
+    @classmethod
+    def _from_compiled(cls, compiled):
+        def build(entries):
+            return [AssistantConfig(**entry) for entry in entries]
+        environments = {name: {"project_ids": list(env["project_ids"]), "assistants": build(env["assistants"])}
+                        for name, env in compiled["environments"].items()}
+        return cls(compiled["project_id"], compiled["name"], build(compiled["assistants"]), environments,
+                   list(compiled["tool_files"]))
+
+    def to_dict(self):
+        """The compiled form (JSON-serializable)."""
+        return {
+            "project_id": self.project_id,
+            "name": self.name,
+            "assistants": [a.to_dict() for a in self.assistants],
+            "environments": {name: {"project_ids": list(env["project_ids"]),
+                                    "assistants": [a.to_dict() for a in env["assistants"]]}
+                             for name, env in self.environments.items()},
+            "tool_files": list(self.tool_files),
+        }
+
+
+def overlay_assistants(base, overrides):
+    """Merge environment overrides into the base assistants, matching by name (new names are appended)."""
+    merged = [dict(a) for a in base]  # overrides replace whole keys, so shallow copies suffice
+    by_name = {a.get("name"): a for a in merged}
+    for override in overrides or []:
+        if override.get("name") in by_name:
+            by_name[override["name"]].update(override)
+        else:
+            merged.append(dict(override))
+    return merged
+
+
+def _signature(path):
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+_compiled = {}  # abspath -> (signatures, sha256, compiled dict, compiled dict as JSON)
+_compiled_lock = threading.Lock()
+
+
+def load_config(path=CONFIG_FILE, cache_path=DEFAULT_CACHE_PATH):
+    """
+    Load and compile epsimo.yaml; raises ConfigError (or OSError when the file is missing).
+
+    The compiled form is cached in memory keyed by the mtime and size of the
+    file and of its tool files, and on disk (`cache_path`, None to disable)
+    keyed by the sha256 of the file, so an unchanged config is neither parsed
+    nor validated again, even by a new process.
+    """
+    key = os.path.abspath(path)
+    base_dir = os.path.dirname(path) or "."
+    with _compiled_lock:
+        cached = _compiled.get(key)
+    if cached is not None and all(_signature(p) == sig for p, sig in cached[0].items()):
+        # Decoding the JSON copy hands out fresh objects much faster than deepcopy.
+        return ProjectConfig._from_compiled(json.loads(cached[3]))
+
+    with open(path, "rb") as f:
+        raw = f.read()
+    digest = hashlib.sha256(raw).hexdigest()
+    compiled = None
+    if cached is not None and cached[1] == digest:
+        compiled = cached[2]  # touched, not changed
+    elif cache_path:
+        compiled = _read_cache(cache_path, key, digest)
+    if compiled is not None and any(_signature(p) != sig for p, sig in compiled["_tool_signatures"].items()):
+        compiled = None  # a tool file changed
+
+    if compiled is None:
+        try:
+            data = yaml.load(raw, Loader=Loader)
+        except yaml.YAMLError as e:
+            raise ConfigError(f"{path}: invalid YAML: {e}")
+        compiled = ProjectConfig.from_dict(data, base_dir=base_dir).to_dict()
+        compiled["_tool_signatures"] = {p: _signature(p) for p in compiled["tool_files"]}
+        if cache_path:
+            _write_cache(cache_path, key, digest, compiled)
+
+    signatures = dict(compiled["_tool_signatures"], **{path: _signature(path)})
+    with _compiled_lock:
+        _compiled[key] = (signatures, digest, compiled, json.dumps(compiled))
+    return ProjectConfig._from_compiled(compiled)
+
+
+def _read_cache(cache_path, key, digest):
+    try:
+        with open(cache_path, "r", encoding="utf-8") as f:
+            entry = json.load(f).get(key)
+    except (OSError, ValueError):
+        return None
+    if entry and entry.get("version") == CACHE_VERSION and entry.get("sha256") == digest:
+        return entry["config"]
+    return None
+
+
+def _write_cache(cache_path, key, digest, compiled):
+    try:
+        with open(cache_path, "r", encoding="utf-8") as f:
+            entries = json.load(f)
+    except (OSError, ValueError):
+        entries = {}
+    entries[key] = {"version": CACHE_VERSION, "sha256": digest, "config": compiled}
+    try:
+        os.makedirs(os.path.dirname(cache_path) or ".", exist_ok=True)
+        tmp = cache_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(entries, f, separators=(",", ":"))
+        os.replace(tmp, cache_path)
+    except OSError:
+        pass  # the cache is an optimization only
@@ -0,0 +1,390 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+from .config import AssistantConfig, ProjectConfig
+from .vdb.transfer import bounded_map
+
+DEFAULT_STATE_PATH = os.path.join(".epsimo", "state.json")
+
+# Keys of `config.configurable` set from epsimo.yaml and compared to detect
+# changes. An update sends the whole configurable, so keys set on the platform
+# outside this list are not kept by a deploy that updates the assistant.
+MANAGED_KEYS = ("type", "type==agent/agent_type", "type==agent/model", "type==agent/system_message",
+                "type==agent/tools")
+
+
+def _assistant_configs(assistants_config):
+    """Accept compiled `AssistantConfig`s or plain epsimo.yaml dicts."""
+    return [a if isinstance(a, AssistantConfig) else AssistantConfig.from_dict(a) for a in assistants_config]
+
+
+def desired_payload(assistant_config):
+    """Payload for one assistant of epsimo.yaml (the same one `Assistants.create` sends)."""
+    if not isinstance(assistant_config, AssistantConfig):
+        assistant_config = AssistantConfig.from_dict(assistant_config)
+    return assistant_config.payload()
+
+
+def remote_payload(assistant, include_public=False):
+    """
+    The managed part of an assistant as returned by the API, in `desired_payload` form.
+    `public` is only compared when epsimo.yaml sets it (`include_public`).
+    """
+    configurable = ((assistant.get("config") or {}).get("configurable") or {})
+    managed = {key: configurable.get(key) for key in MANAGED_KEYS}
+    # assistants created by older versions have no tools key when empty
+    managed["type==agent/tools"] = managed["type==agent/tools"] or []
+    payload = {"name": assistant.get("name"), "config": {"configurable": managed}}
+    if include_public:
+        payload["public"] = bool(assistant.get("public", False))
+    return payload
+
+
+def payload_hash(payload):
+    """Stable hash of a payload (canonical JSON: sorted keys, no whitespace)."""
+    canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def plan_deploy(assistants_config, remote_assistants):
+    """
+    Compare epsimo.yaml with the assistants of a project.
+
+    Returns:
+        One action per configured assistant:
+        {"action": "create" | "update" | "noop", "name", "assistant_id", "payload", "hash"}
+    """
+    remote = {a.get("name"): a for a in remote_assistants or []}
+    actions = []
+    for assistant_config in _assistant_configs(assistants_config):
+        payload = assistant_config.payload()
+        digest = payload_hash(payload)
+        current = remote.get(payload["name"])
+        if current is None:
+            action, assistant_id = "create", None
+        else:
+            assistant_id = current.get("assistant_id")
+            remote_digest = payload_hash(remote_payload(current, include_public="public" in payload))
+            action = "noop" if remote_digest == digest else "update"
+        actions.append({"action": action, "name": payload["name"], "assistant_id": assistant_id,
+                        "payload": payload, "hash": digest,
+                        "updated_at": current.get("updated_at") if current else None})
+    return actions
+
+
+def plan_from_state(assistants_config, entries):
+    """
+    Plan without contacting the platform, trusting the last deploy's state.
+
+    Returns:
+        Actions as `plan_deploy()`, or None when an assistant is not in the
+        state yet (a listing is needed to know whether it exists).
+    """
+    actions = []
+    for assistant_config in _assistant_configs(assistants_config):
+        entry = entries.get(assistant_config.name)
+        if entry is None or not entry.get("assistant_id"):
+            return None
+        payload = assistant_config.payload()
+        digest = payload_hash(payload)
+        actions.append({"action": "noop" if entry.get("hash") == digest else "update",
+                        "name": payload["name"], "assistant_id": entry["assistant_id"],
+                        "payload": payload, "hash": digest, "updated_at": entry.get("updated_at")})
+    return actions
+
+
+def detect_drift(entries, remote_assistants):
+    """
+    Assistants changed outside `epsimo deploy` since the last deploy.
+
+    Returns:
+        List of {"name", "assistant_id", "drift": "deleted" | "modified"}.
+    """
+    remote = {a.get("name"): a for a in remote_assistants or []}
+    drifted = []
+    for name, entry in sorted(entries.items()):
+        current = remote.get(name)
+        if current is None or current.get("assistant_id") != entry.get("assistant_id"):
+            drifted.append({"name": name, "assistant_id": entry.get("assistant_id"), "drift": "deleted"})
+        elif entry.get("updated_at") is not None and current.get("updated_at") == entry["updated_at"]:
+            continue  # untouched since our deploy: no need to hash it
+        elif entry.get("hash") and payload_hash(
+                remote_payload(current, include_public=entry.get("manages_public", False))) != entry["hash"]:
+            drifted.append({"name": name, "assistant_id": entry.get("assistant_id"), "drift": "modified"})
+    return drifted
+
+
+class DeployState:
+    """
+    What the last deploy left on the platform, per project: assistant ids,
+    payload hashes and server update times, stored in `.epsimo/state.json`.
+    Lets later deploys plan without listing assistants.
+    """
+    def __init__(self, path=None):
+        self.path = path or DEFAULT_STATE_PATH
+        self.projects = {}
+        self._lock = threading.Lock()
+        if os.path.exists(self.path):
+            with open(self.path, "r", encoding="utf-8") as f:
+                self.projects = json.load(f).get("projects", {})
+
+    def assistants(self, project_id):
+        return self.projects.get(project_id, {}).get("assistants", {})
+
+    def record(self, project_id, results):
+        """Store the outcome of `apply_plan()`; failed actions keep their previous entry."""
+        previous = self.assistants(project_id)
+        entries = {}
+        for result in results:
+            if result.get("status") == "failed":
+                if result["name"] in previous:
+                    entries[result["name"]] = previous[result["name"]]
+                continue
+            entries[result["name"]] = {"assistant_id": result["assistant_id"], "hash": result["hash"],
+                                       "updated_at": result.get("updated_at"),
+                                       "manages_public": "public" in result["payload"]}
+        with self._lock:
+            self.projects[project_id] = {"assistants": entries, "deployed_at": time.time()}
+
+    def forget(self, project_id):
+        with self._lock:
+            self.projects.pop(project_id, None)
+
+    def save(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp = self.path + ".tmp"
+        with self._lock, open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"version": 1, "projects": self.projects}, f, indent=2, sort_keys=True)
+        os.replace(tmp, self.path)
+
+
+def summarize(actions):
+    counts = {"create": 0, "update": 0, "noop": 0}
+    for action in actions:
+        counts[action["action"]] += 1
+    return counts
+
+
+def apply_plan(client, project_id, actions, concurrency=8):
+    """
+    Run the creates and updates of a plan concurrently (no-ops send nothing).
+
+    Returns:
+        The actions with "status" ("ok" | "failed" | "skipped"), "seconds",
+        "error", "status_code" (HTTP status of a failure), the server's
+        "updated_at" and, for creates, the new "assistant_id".
+    """
+    def apply(item):
+        index, action = item
+        result = dict(action, status="skipped", seconds=0.0, error=None, status_code=None)
+        if action["action"] == "noop":
+            return index, result
+        started = time.monotonic()
+        try:
+            if action["action"] == "create":
+                configurable = action["payload"]["config"]["configurable"]
+                created = client.assistants.create(
+                    project_id=project_id,
+                    name=action["name"],
+                    model=configurable["type==agent/model"],
+                    instructions=configurable["type==agent/system_message"],
+                    tools=configurable["type==agent/tools"],
+                    public=action["payload"].get("public", False),
+                )
+                result["assistant_id"] = (created or {}).get("assistant_id")
+                response = created
+            else:
+                response = client.assistants.update(project_id, action["assistant_id"], action["payload"])
+            result.update(status="ok", updated_at=(response or {}).get("updated_at"))
+        except Exception as e:
+            response = getattr(e, "response", None)
+            result.update(status="failed", error=str(e), status_code=getattr(response, "status_code", None))
+        result["seconds"] = round(time.monotonic() - started, 3)
+        return index, result
+
+    results = sorted(bounded_map(apply, enumerate(actions), concurrency=concurrency), key=lambda r: r[0])
+    return [result for _, result in results]
+
+
+def deploy_project(client, project_id, assistants_config, state=None, refresh=False, dry_run=False,
+                   concurrency=8, on_plan=None, verify=False):
+    """
+    Plan and apply epsimo.yaml for one project.
+
+    The plan comes from `state` when every assistant is recorded there, so an
+    unchanged project costs no request. Changes made on the platform since the
+    last deploy are then not seen; with `verify=True`, one listing of the
+    project's assistants checks the state first (assistants whose `updated_at`
+    moved are hashed) and any drift makes the plan come from the listing.
+    Without a usable state, or with `refresh=True`, the plan always comes from
+    the listing. An update answered by 404 means the state is stale: the
+    project is re-planned from a new listing. `on_plan(actions, source,
+    drift)` is called before applying.
+
+    Returns:
+        {"project_id", "source": "state" | "remote", "drift", "replanned", "results",
+         "counts", "failed", "seconds"}
+    """
+    started = time.monotonic()
+    entries = state.assistants(project_id) if state is not None else {}
+    actions = None if refresh else plan_from_state(assistants_config, entries)
+    source, drift, remote = "state", [], None
+    if actions is not None and verify:
+        remote = client.assistants.list(project_id)
+        drift = detect_drift(entries, remote)
+        if drift:
+            actions = None
+    if actions is None:
+        if remote is None:
+            remote = client.assistants.list(project_id)
+            drift = detect_drift(entries, remote)
+        actions, source = plan_deploy(assistants_config, remote), "remote"
+    if on_plan:
+        on_plan(actions, source, drift)
+
+    results, replanned = actions, False
+    if not dry_run:
+        results = apply_plan(client, project_id, actions, concurrency=concurrency)
+        if source == "state" and any(r["status_code"] == 404 for r in results):
+            remote = client.assistants.list(project_id)
+            actions, source = plan_deploy(assistants_config, remote), "remote"
+            drift = detect_drift(entries, remote)
+            results = apply_plan(client, project_id, actions, concurrency=concurrency)
+            replanned = True
+        if state is not None:
+            state.record(project_id, results)
+
+    return {
+        "project_id": project_id,
+        "source": source,
+        "drift": drift,
+        "replanned": replanned,
+        "results": results,
+        "counts": summarize(actions),
+        "failed": [r for r in results if r.get("status") == "failed"],
+        "seconds": round(time.monotonic() - started, 3),
+    }
+
+
+class FileWatcher:
+    """
+    Polls files for changes (mtime and size) and reports a change once the
+    files have been quiet for `debounce` seconds, so an editor's burst of
+    writes triggers one redeploy. Polling a few files every `interval`
+    seconds costs a handful of stat() calls.
+    """
+    def __init__(self, paths, interval=0.1, debounce=0.2):
+        self.paths = list(paths)
+        self.interval = interval
+        self.debounce = debounce
+        self._signatures = self._snapshot()
+
+    def _snapshot(self):
+        signatures = {}
+        for path in self.paths:
+            try:
+                stat = os.stat(path)
+                signatures[path] = (stat.st_mtime_ns, stat.st_size)
+            except FileNotFoundError:
+                signatures[path] = None
+        return signatures
+
+    def watch(self, paths):
+        """Replace the watched files (e.g. after the config started using a new tool file)."""
+        self.paths = list(paths)
+        self._signatures = self._snapshot()
+
+    def wait(self, stop=None):
+        """
+        Block until a watched file changed and settled.
+
+        Returns:
+            Sorted list of the files that changed, or None when `stop` (a
+            threading.Event) was set.
+        """
+        changed, last_change = set(), None
+        while stop is None or not stop.is_set():
+            time.sleep(self.interval)
+            current = self._snapshot()
+            now = time.monotonic()
+            diff = {path for path in current if current[path] != self._signatures.get(path)}
+            if diff:
+                changed |= diff
+                last_change = now
+                self._signatures = current
+            elif changed and now - last_change >= self.debounce:
+                return sorted(changed)
+        return None
+
+
+def resolve_targets(config, environments=None, project_ids=None):
+    """
+    Expand epsimo.yaml into deploy targets.
+
+    Each entry of `environments:` may set `project_id` or `project_ids` and
+    `assistants` overrides (merged by name into the top-level assistants).
+    `project_ids` deploys the top-level assistants to extra projects.
+    Without either, the single target is the top-level `project_id`.
+    `config` is a `ProjectConfig` or the parsed epsimo.yaml.
+
+    Returns:
+        List of {"target", "project_id", "assistants"}.
+    """
+    if not isinstance(config, ProjectConfig):
+        config = ProjectConfig.from_dict(config)
+    base = config.assistants
+    if not environments and not project_ids:
+        return [{"target": "default", "project_id": config.project_id, "assistants": base}]
+
+    targets = []
+    defined = config.environments
+    for name in environments or []:
+        if name not in defined:
+            raise ValueError(f"Unknown environment '{name}' (defined: {', '.join(defined) or 'none'})")
+        env = defined[name]
+        for project_id in env["project_ids"]:
+            targets.append({"target": name, "project_id": project_id, "assistants": env["assistants"]})
+    for project_id in project_ids or []:
+        targets.append({"target": project_id, "project_id": project_id, "assistants": base})
+
+    seen = set()
+    for target in targets:
+        if not target["project_id"]:
+            raise ValueError(f"No project_id for target '{target['target']}'")
+        if target["project_id"] in seen:
+            raise ValueError(f"Project {target['project_id']} is targeted more than once")
+        seen.add(target["project_id"])
+    return targets
+
+
+def deploy_many(client, targets, state=None, project_concurrency=4, concurrency=8, refresh=False,
+                dry_run=False, on_report=None, verify=False):
+    """
+    Deploy several targets concurrently with one client (one session, token
+    cache and rate limiter). A failing project does not stop the others.
+
+    Returns:
+        One `deploy_project()` report per target, in target order, with
+        "target" set and "error" for projects that could not be deployed.
+    """
+    def deploy(item):
+        index, target = item
+        try:
+            report = deploy_project(client, target["project_id"], target["assistants"], state=state,
+                                    refresh=refresh, dry_run=dry_run, concurrency=concurrency, verify=verify)
+            report["error"] = None
+        except Exception as e:
+            report = {"project_id": target["project_id"], "error": str(e), "failed": [], "drift": [],
+                      "counts": {"create": 0, "update": 0, "noop": 0}, "seconds": 0.0}
+        report["target"] = target["target"]
+        if on_report:
+            on_report(report)
+        return index, report
+
+    reports = sorted(bounded_map(deploy, enumerate(targets), concurrency=project_concurrency), key=lambda r: r[0])
+    return [report for _, report in reports]
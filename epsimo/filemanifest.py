@@ -0,0 +1,143 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+def default_manifest_path(assistant_id):
+    return os.path.join(".epsimo", "files", f"{assistant_id}.json")
+
+
+def sha256_file(path, chunk_size=1024 * 1024):
+    """Streaming sha256 of a file (constant memory)."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(chunk_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def remote_file_id(entry):
+    """File id of an upload response or `Files.list` entry."""
+    if isinstance(entry, list) and entry:
+        entry = entry[0]
+    if isinstance(entry, dict):
+        return entry.get("file_id") or entry.get("id")
+    return None
+
+
+def remote_files(listing):
+    """Entries of a `Files.list` response (a list, or a dict wrapping one)."""
+    if isinstance(listing, dict):
+        listing = listing.get("files") or listing.get("data")
+    return listing if isinstance(listing, list) else []
+
+
+def remote_file_name(entry):
+    if isinstance(entry, dict):
+        return entry.get("filename") or entry.get("name") or entry.get("file_name")
+    return None
+
+
+class FileManifest:
+    """
+    Local record of the files attached to one assistant.
+
+    Maps content hashes (sha256) to remote file ids, so unchanged content is
+    never uploaded twice, and caches the hash of each local path by size and
+    mtime, so unchanged files are not hashed again either. `synced` tracks
+    which remote file each path of a synced directory was uploaded as.
+    Stored as JSON under `.epsimo/files/<assistant_id>.json`.
+    """
+    def __init__(self, assistant_id, path=None):
+        self.assistant_id = assistant_id
+        self.path = path or default_manifest_path(assistant_id)
+        self.files = {}
+        self.paths = {}
+        self.synced = {}
+        self._lock = threading.Lock()
+        if os.path.exists(self.path):
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self.files = data.get("files", {})
+            self.paths = data.get("paths", {})
+            self.synced = data.get("synced", {})
+
+    def lookup(self, digest):
+        """Manifest entry ({"file_id", "name", "size", "uploaded_at"}) for a content hash, or None."""
+        return self.files.get(digest)
+
+    def record(self, digest, file_id, name, size):
+        with self._lock:
+            self.files[digest] = {"file_id": file_id, "name": name, "size": size, "uploaded_at": time.time()}
+
+    def forget(self, digest):
+        with self._lock:
+            self.files.pop(digest, None)
+
+    def record_sync(self, name, digest, file_id):
+        with self._lock:
+            self.synced[name] = {"sha256": digest, "file_id": file_id}
+
+    def forget_sync(self, name):
+        with self._lock:
+            self.synced.pop(name, None)
+
+    def hash_paths(self, paths, workers=None):
+        """
+        Return {path: sha256}, hashing only files whose size or mtime changed.
+        Files are hashed in parallel; hashlib releases the GIL on large
+        buffers, so threads spread the work over all cores.
+        """
+        results, todo = {}, []
+        for path in paths:
+            stat = os.stat(path)
+            cached = self.paths.get(os.path.abspath(path))
+            if cached and cached["size"] == stat.st_size and cached["mtime_ns"] == stat.st_mtime_ns:
+                results[path] = cached["sha256"]
+            else:
+                todo.append((path, stat))
+        if todo:
+            workers = workers or min(32, os.cpu_count() or 1)
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                for (path, stat), digest in zip(todo, pool.map(lambda item: sha256_file(item[0]), todo)):
+                    results[path] = digest
+                    self.paths[os.path.abspath(path)] = {
+                        "size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": digest,
+                    }
+        return results
+
+    def reconcile(self, listing):
+        """
+        Align the manifest with the assistant's actual files (`Files.list`):
+        entries whose file was deleted remotely are dropped, and entries
+        recorded without an id get it from a remote file of the same name.
+
+        Returns:
+            Number of entries dropped.
+        """
+        entries = remote_files(listing)
+        remote_ids = {remote_file_id(f) for f in entries} - {None}
+        by_name = {remote_file_name(f): remote_file_id(f) for f in entries}
+        dropped = 0
+        with self._lock:
+            for digest, entry in list(self.files.items()):
+                if entry["file_id"] is None and by_name.get(entry["name"]):
+                    entry["file_id"] = by_name[entry["name"]]
+                if entry["file_id"] not in remote_ids:
+                    del self.files[digest]
+                    dropped += 1
+        return dropped
+
+    def save(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp = self.path + ".tmp"
+        with self._lock:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"assistant_id": self.assistant_id, "files": self.files, "paths": self.paths,
+                           "synced": self.synced}, f, indent=2)
+        os.replace(tmp, self.path)
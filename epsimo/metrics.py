@@ -0,0 +1,43 @@
+import threading
+
+class Metrics:
+    """
+    Thread-safe counters and gauges collected by the SDK.
+    Counters accumulate (e.g. cache hits), gauges hold the latest value (e.g. hit ratio).
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._gauges = {}
+
+    def incr(self, name, value=1):
+        """Increment a counter."""
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def gauge(self, name, value):
+        """Set a gauge to its latest value."""
+        with self._lock:
+            self._gauges[name] = value
+
+    def get(self, name, default=0):
+        """Read a single counter or gauge."""
+        with self._lock:
+            if name in self._gauges:
+                return self._gauges[name]
+            return self._counters.get(name, default)
+
+    def snapshot(self, prefix=None):
+        """Return a copy of all metrics, optionally filtered by name prefix."""
+        with self._lock:
+            data = dict(self._counters)
+            data.update(self._gauges)
+        if prefix:
+            data = {k: v for k, v in data.items() if k.startswith(prefix)}
+        return data
+
+    def reset(self):
+        """Clear all metrics."""
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
@@ -0,0 +1,106 @@
+import mimetypes
+import os
+import time
+import uuid
+
+
+class MultipartEncoder:
+    """
+    Streaming multipart/form-data body.
+
+    Behaves as a read-only file object with a known length, so `requests`
+    sends it with a Content-Length header while reading it in small blocks:
+    file contents are read from disk in `chunk_size` pieces as the upload
+    progresses and memory use does not depend on the file size.
+
+    Usage:
+        with MultipartEncoder({"files": path}, on_progress=print) as body:
+            session.post(url, data=body, headers={"Content-Type": body.content_type})
+    """
+    def __init__(self, files, fields=None, chunk_size=1024 * 1024, on_progress=None):
+        self.boundary = uuid.uuid4().hex
+        self.chunk_size = chunk_size
+        self.on_progress = on_progress
+        self.sent = 0
+        self.started_at = None
+        self._segments = []
+        self._handles = []
+
+        for name, value in (fields or {}).items():
+            self._segments.append(self._header(name) + f"\r\n{value}\r\n".encode("utf-8"))
+        for name, path in files.items():
+            filename = os.path.basename(path)
+            content_type = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+            handle = open(path, "rb")
+            self._handles.append(handle)
+            self._segments.append(self._header(name, filename, content_type) + b"\r\n")
+            self._segments.append((handle, os.fstat(handle.fileno()).st_size))
+            self._segments.append(b"\r\n")
+        self._segments.append(f"--{self.boundary}--\r\n".encode("ascii"))
+
+        self.len = sum(s[1] if isinstance(s, tuple) else len(s) for s in self._segments)
+        self._index = 0
+        self._offset = 0
+
+    @property
+    def content_type(self):
+        return f"multipart/form-data; boundary={self.boundary}"
+
+    def __len__(self):
+        return self.len
+
+    def read(self, size=-1):
+        """Return up to `size` bytes of the body (at most `chunk_size` from a file at a time)."""
+        if self.started_at is None:
+            self.started_at = time.monotonic()
+        size = self.chunk_size if size is None or size < 0 else size
+        out = bytearray()
+        while len(out) < size and self._index < len(self._segments):
+            segment = self._segments[self._index]
+            if isinstance(segment, tuple):
+                handle, length = segment
+                data = handle.read(min(size - len(out), self.chunk_size, length - self._offset))
+                if not data and self._offset < length:
+                    raise IOError(f"{handle.name} shrank while uploading")
+            else:
+                data = segment[self._offset:self._offset + size - len(out)]
+                length = len(segment)
+            out += data
+            self._offset += len(data)
+            if self._offset >= length:
+                self._index += 1
+                self._offset = 0
+        if out:
+            previous, self.sent = self.sent, self.sent + len(out)
+            # Report once per chunk_size sent rather than on every small read.
+            if self.on_progress and (self.sent // self.chunk_size != previous // self.chunk_size or self.sent == self.len):
+                self.on_progress(self.sent, self.len)
+        return bytes(out)
+
+    @property
+    def throughput(self):
+        """Bytes per second since the first read."""
+        if self.started_at is None:
+            return 0.0
+        elapsed = time.monotonic() - self.started_at
+        return self.sent / elapsed if elapsed > 0 else 0.0
+
+    def close(self):
+        for handle in self._handles:
+            handle.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def _header(self, name, filename=None, content_type=None):
+        disposition = f'form-data; name="{name}"'
+        if filename is not None:
+            disposition += '; filename="{}"'.format(filename.replace('"', "%22"))
+        header = f"--{self.boundary}\r\nContent-Disposition: {disposition}\r\n"
+        if content_type:
+            header += f"Content-Type: {content_type}\r\n"
+        return header.encode("utf-8")
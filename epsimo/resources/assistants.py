@@ -1,3 +1,5 @@
+from ..config import assistant_payload
+
 class Assistants:
     def __init__(self, client):
         self.client = client
@@ -8,27 +10,9 @@ class Assistants:
         return self.client.request("GET", "/assistants/", headers=headers)
 
     def create(self, project_id, name, model="gpt-4o", instructions="", tools=None, public=False):
-        """Create a new assistant."""
+        """Create a new assistant (same payload as `epsimo deploy` sends for this configuration)."""
         headers = self.client.get_project_headers(project_id)
-        
-        # Construct configurable config
-        configurable = {
-            "type": "agent",
-            "type==agent/agent_type": "GPT-4O", # legacy/specific key
-            "type==agent/model": model,
-            "type==agent/system_message": instructions,
-        }
-        
-        if tools:
-            # Normalize tools format if needed, or assume list of dicts
-            # The API expects specific structure
-             configurable["type==agent/tools"] = tools
-
-        payload = {
-            "name": name,
-            "config": {"configurable": configurable},
-            "public": public
-        }
+        payload = assistant_payload(name, model=model, instructions=instructions, tools=tools, public=public)
         return self.client.request("POST", "/assistants/", json=payload, headers=headers)
 
     def get(self, project_id, assistant_id):
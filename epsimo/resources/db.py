@@ -1,3 +1,235 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from ..vdb.buffer import BufferedThread, WriteBehindWriter
+from ..vdb.codec import CODEC_MARKER, ValueCodec, is_chunk_key, is_envelope
+from ..vdb.collection import Collection
+from ..vdb.crdt import CRDT_TYPES, crdt_value, merge_crdts, new_writer_id
+from ..vdb.history import HistoryLog
+from ..vdb.index import StateIndex
+from ..vdb.journal import Batch, Journal
+from ..vdb.query import compile_path, root_key, select
+from ..vdb.replica import ReadReplica
+from ..vdb.transfer import export_project, import_project
+from ..vdb.ttl import (EXPIRES_KEY, TTLSweeper, expired_keys, expiry_entries, expiry_entry, expiry_key,
+                       is_expired, is_expiry_key, live_entries, stale_entries, visible)
+from ..vdb.watch import Watcher
+from ..vdb.state import diff_values, fingerprint, state_size, state_version
+from ..vdb.transaction import Transaction
+
+
+class _CacheEntry:
+    __slots__ = ("state", "etag", "version", "size", "fetched_at")
+
+    def __init__(self, state, etag, size):
+        self.state = state
+        self.etag = etag
+        self.version = state_version(state)
+        self.size = size
+        self.fetched_at = time.monotonic()
+
+
+class StateCache:
+    """
+    Per-thread LRU cache of thread states.
+
+    Entries are evicted when the cache holds more than `max_entries` threads or
+    `max_bytes` of serialized state. Entries older than `ttl` seconds are
+    revalidated against the server (ETag or checkpoint version) before reuse.
+    """
+    def __init__(self, metrics=None, ttl=30.0, max_entries=256, max_bytes=64 * 1024 * 1024):
+        self.metrics = metrics
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._lock = threading.RLock()
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+        self.evictions = 0
+        self.bytes_saved = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, thread_id):
+        return thread_id in self._entries
+
+    @property
+    def hit_ratio(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def lookup(self, thread_id):
+        """Return the cache entry for a thread (fresh or stale), or None."""
+        with self._lock:
+            entry = self._entries.get(thread_id)
+            if entry is not None:
+                self._entries.move_to_end(thread_id)
+            return entry
+
+    def is_fresh(self, entry):
+        return self.ttl is not None and time.monotonic() - entry.fetched_at < self.ttl
+
+    def store(self, thread_id, state, etag=None):
+        """Insert or replace the cached state of a thread."""
+        entry = _CacheEntry(state, etag, state_size(state))
+        with self._lock:
+            self._drop(thread_id)
+            if entry.size > self.max_bytes:
+                return entry
+            self._entries[thread_id] = entry
+            self._bytes += entry.size
+            self._evict()
+        return entry
+
+    def touch(self, thread_id):
+        """Mark a cached entry as freshly validated."""
+        with self._lock:
+            entry = self._entries.get(thread_id)
+            if entry is not None:
+                entry.fetched_at = time.monotonic()
+            return entry
+
+    def merge_values(self, thread_id, values):
+        """Apply a write to the cached `values` of a thread (write-through)."""
+        with self._lock:
+            entry = self._entries.get(thread_id)
+            if entry is None:
+                return
+            state = dict(entry.state)
+            current = state.get("values")
+            state["values"] = {**(current if isinstance(current, dict) else {}), **values}
+            # The server assigns a new checkpoint/ETag on write: drop the stale
+            # markers so the next revalidation is a full fetch.
+            for key in ("version", "checkpoint_id", "config"):
+                state.pop(key, None)
+            self.store(thread_id, state, etag=None)
+
+    def invalidate(self, thread_id=None):
+        """Drop one thread from the cache, or everything when `thread_id` is None."""
+        with self._lock:
+            if thread_id is None:
+                self._entries.clear()
+                self._bytes = 0
+            else:
+                self._drop(thread_id)
+
+    def record_hit(self, entry, revalidated=False):
+        with self._lock:
+            self.hits += 1
+            self.bytes_saved += entry.size
+            if revalidated:
+                self.revalidations += 1
+        self._report("hits", 1, entry.size, revalidated)
+
+    def record_miss(self, revalidated=False):
+        with self._lock:
+            self.misses += 1
+            if revalidated:
+                self.revalidations += 1
+        self._report("misses", 1, revalidated=revalidated)
+
+    def stats(self):
+        """Return a summary of cache usage."""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "revalidations": self.revalidations,
+                "evictions": self.evictions,
+                "bytes_saved": self.bytes_saved,
+                "hit_ratio": self.hit_ratio,
+            }
+
+    def _drop(self, thread_id):
+        entry = self._entries.pop(thread_id, None)
+        if entry is not None:
+            self._bytes -= entry.size
+
+    def _evict(self):
+        while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            _, entry = self._entries.popitem(last=False)
+            self._bytes -= entry.size
+            self.evictions += 1
+            if self.metrics:
+                self.metrics.incr("db.cache.evictions")
+        if self.metrics:
+            self.metrics.gauge("db.cache.bytes", self._bytes)
+            self.metrics.gauge("db.cache.entries", len(self._entries))
+
+    def _report(self, counter, value, bytes_saved=0, revalidated=False):
+        if not self.metrics:
+            return
+        self.metrics.incr(f"db.cache.{counter}", value)
+        if bytes_saved:
+            self.metrics.incr("db.cache.bytes_saved", bytes_saved)
+        if revalidated:
+            self.metrics.incr("db.cache.revalidations")
+        self.metrics.gauge("db.cache.hit_ratio", self.hit_ratio)
+
+
+# Envelopes carry their algorithm, so any codec instance can read them.
+_ENVELOPE_READER = ValueCodec(algorithm="zlib")
+
+
+class TrackedDocument(dict):
+    """
+    A dict holding a thread's values that remembers what was last loaded or saved.
+    `save()` sends only the top-level keys that changed since then.
+
+    Usage:
+        with client.db.track(project_id, thread_id) as doc:
+            doc["status"] = "active"
+            doc["profile"]["name"] = "Ada"
+    """
+    def __init__(self, db, project_id, thread_id, values):
+        super().__init__(copy.deepcopy(values))
+        self._db = db
+        self.project_id = project_id
+        self.thread_id = thread_id
+        self._snapshot = {k: fingerprint(v) for k, v in self.items()}
+
+    def changes(self):
+        """Return the keys that changed since the last load/save (removed keys map to None)."""
+        changes = {k: v for k, v in self.items() if self._snapshot.get(k) != fingerprint(v)}
+        for key in self._snapshot:
+            if key not in self:
+                changes[key] = None
+        return changes
+
+    def save(self):
+        """Persist the changed keys; returns the dict that was sent (empty when nothing changed)."""
+        changes = self.changes()
+        self._db._record_patch(changes, len(self) - len(changes))
+        if changes:
+            self._db.update(self.project_id, self.thread_id, changes)
+        self._snapshot = {k: fingerprint(v) for k, v in self.items()}
+        return changes
+
+    def refresh(self):
+        """Reload the values from the thread state, discarding local changes."""
+        values = self._db.get_all(self.project_id, self.thread_id)
+        self.clear()
+        self.update(copy.deepcopy(values) if isinstance(values, dict) else {})
+        self._snapshot = {k: fingerprint(v) for k, v in self.items()}
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.save()
+        return False
+
+
 class Database:
     """
     The Database resource allows using Epsimo threads as a virtual structured storage.
@@ -5,27 +237,554 @@ class Database:
     """
     def __init__(self, client):
         self.client = client
+        self.cache = None
+        self.codec = None
+        self.history = None
+        self._writer = None
+        self._replicas = []
+        self._crdts = {}
+        self._chunk_index = {}  # thread_id -> {key: chunked envelope metadata}, without the cache
+        # CRDT slot owner for this client; two clients must never share one.
+        self.writer_id = new_writer_id()
+        self._journal = None
+
+    # --- Cache ---
+
+    def enable_cache(self, ttl=30.0, max_entries=256, max_bytes=64 * 1024 * 1024):
+        """
+        Enable the read-through / write-through state cache.
+
+        Args:
+            ttl: Seconds a cached state is served without contacting the server.
+                 Use 0 to revalidate (ETag / checkpoint version) on every read.
+            max_entries: Maximum number of threads kept in the cache.
+            max_bytes: Maximum total size of cached states (serialized JSON).
+        """
+        self.cache = StateCache(self.client.metrics, ttl=ttl, max_entries=max_entries, max_bytes=max_bytes)
+        return self.cache
+
+    def disable_cache(self):
+        """Disable and drop the state cache."""
+        self.cache = None
+
+    def invalidate(self, thread_id=None):
+        """Invalidate the cached state of a thread, or of all threads when omitted."""
+        if self.cache is not None:
+            self.cache.invalidate(thread_id)
+
+    def get_state(self, project_id, thread_id):
+        """
+        Retrieve the full thread state, served from the cache when enabled.
+        The caller owns the returned dict: changing it does not affect the cache.
+        """
+        state = self._read_state(project_id, thread_id)
+        return copy.deepcopy(state) if self.cache is not None else state
+
+    def _read_state(self, project_id, thread_id):
+        """Like `get_state()` but may return the cached object itself; never mutate the result."""
+        cache = self.cache
+        if cache is None:
+            return self._observe(thread_id, self.client.threads.get_state(project_id, thread_id))
+
+        entry = cache.lookup(thread_id)
+        if entry is not None and cache.is_fresh(entry):
+            cache.record_hit(entry)
+            return entry.state
+
+        state, etag = self.client.threads.get_state_if_changed(
+            project_id, thread_id, etag=entry.etag if entry else None
+        )
+        if state is None and entry is not None:
+            cache.touch(thread_id)
+            cache.record_hit(entry, revalidated=True)
+            return entry.state
+
+        # Same checkpoint: the payload was transferred but the cached copy was still valid.
+        unchanged = entry is not None and entry.version is not None and entry.version == state_version(state)
+        cache.record_miss(revalidated=unchanged)
+        cache.store(thread_id, state, etag=etag)
+        return self._observe(thread_id, state)
+
+    # --- Key/value access ---
 
     def get_all(self, project_id, thread_id):
         """Retrieve all structured data stored in the thread state."""
-        state = self.client.threads.get_state(project_id, thread_id)
-        return state.get("values", {})
+        state = self._read_state(project_id, thread_id)
+        values = merge_crdts(visible(self.decode_values(state.get("values", {}))))
+        return copy.deepcopy(values) if self.cache is not None else values
 
     def get(self, project_id, thread_id, key, default=None):
         """Retrieve a specific key from the thread state."""
+        value = self._lookup(project_id, thread_id, key, default)
+        return default if value is None else value
+
+    def _lookup(self, project_id, thread_id, key, default):
+        """Like `get()`, but a deleted key (null tombstone) reads as None rather than `default`."""
+        values = self._read_state(project_id, thread_id).get("values", {})
+        if not isinstance(values, dict) or is_expiry_key(key):
+            return default
+        if values.get(key) is None:
+            found, value = crdt_value(values, key)
+            if found or key not in values:
+                return value if found else default
+        # Only this key (and its expiry entry) is decompressed / reassembled.
+        value = self._reader.decode(key, values[key], values)
+        expiry = {k: self._reader.decode(k, values[k], values) for k in (expiry_key(key), EXPIRES_KEY) if k in values}
+        if is_expired(key, value, expiry_entry(expiry, key)):
+            return default
+        return copy.deepcopy(value) if self.cache is not None else value
+
+    def _raw_values(self, project_id, thread_id):
+        """Decoded values as stored, with null tombstones, expiry entries and CRDT slots."""
+        values = self._read_state(project_id, thread_id).get("values", {})
+        values = self.decode_values(values) if isinstance(values, dict) else {}
+        return copy.deepcopy(values) if self.cache is not None else values
+
+    def query(self, project_id, thread_id, path, include_messages=False):
+        """
+        Yield the values matching a path expression such as `orders[*].total`.
+
+        A path starting with a key only decodes that key. A path starting with
+        a wildcard scans all values, skipping the `messages` history unless
+        `include_messages` is set.
+        """
+        steps = compile_path(path)
+        key = root_key(steps)
+        if key is not None:
+            missing = object()
+            value = self.get(project_id, thread_id, key, default=missing)
+            if value is not missing:
+                yield from select(value, steps[1:])
+            return
         values = self.get_all(project_id, thread_id)
-        if isinstance(values, dict):
-            return values.get(key, default)
-        return default
+        if not include_messages:
+            values = {k: v for k, v in values.items() if k != "messages"}
+        yield from select(values, steps)
 
-    def set(self, project_id, thread_id, key, value):
+    def set(self, project_id, thread_id, key, value, ttl=None):
         """
-        Store a value in the thread state. 
-        Note: This currently attempts a manual state update which may be restricted 
+        Store a value in the thread state.
+        Note: This currently attempts a manual state update which may be restricted
         depending on assistant configuration.
+
+        With `ttl` (seconds) the key is hidden from reads once it expires and
+        nulled by the next `sweep()`.
         """
-        return self.client.threads.set_state(project_id, thread_id, {key: value})
+        return self.update(project_id, thread_id, {key: value}, ttl=ttl)
 
-    def update(self, project_id, thread_id, data):
+    def update(self, project_id, thread_id, data, if_match=None, ttl=None):
         """Bulk update the thread state with a dictionary of values."""
-        return self.client.threads.set_state(project_id, thread_id, data)
+        if ttl is not None:
+            # Each key has its own expiry entry, so they are written along with the values.
+            data = {**data, **expiry_entries(data, ttl)}
+
+        batches = [data]
+        if self.codec is not None:
+            batches = self.codec.encode(data, self._chunked_values(project_id, thread_id, data))
+            self._index_chunks(thread_id, batches[-1])
+
+        result = None
+        for i, batch in enumerate(batches):
+            try:
+                # Chunk writes change the ETag, so only the first request can be conditional.
+                result = self.client.threads.set_state(project_id, thread_id, batch,
+                                                       if_match=if_match if i == 0 else None)
+            except Exception:
+                self.invalidate(thread_id)
+                raise
+            if self.cache is not None:
+                self.cache.merge_values(thread_id, batch)
+        for replica in list(self._replicas):
+            replica.apply_write(thread_id, data)
+        return result
+
+    def _write_raw(self, project_id, thread_id, values):
+        """Write stored values as they are (envelopes and chunk keys included), in one state update."""
+        try:
+            result = self.client.threads.set_state(project_id, thread_id, values)
+        finally:
+            self.invalidate(thread_id)
+            self._chunk_index.pop(thread_id, None)
+        for replica in list(self._replicas):
+            replica.apply_write(thread_id, values)
+        return result
+
+    # --- Expiry ---
+
+    def sweep(self, project_id, thread_ids):
+        """
+        Null expired keys and clear stale expiry entries, with one bulk write per thread.
+        Thread state cannot drop keys, so they stay as null tombstones (hidden
+        from reads) until the thread is rewritten by `compact()`.
+        Accepts one thread id or a list; returns {thread_id: [expired keys]}.
+        """
+        if isinstance(thread_ids, str):
+            thread_ids = [thread_ids]
+        removed = {}
+        for thread_id in thread_ids:
+            expired = []
+
+            def apply(values):
+                expired[:] = expired_keys(values)
+                for key in expired:
+                    values[key] = None
+                values.update(stale_entries(values))
+
+            Transaction(self, project_id, thread_id, raw=True).run(apply)
+            removed[thread_id] = list(expired)
+            self.client.metrics.incr("db.ttl.expired", len(expired))
+        return removed
+
+    def start_sweeper(self, project_id, thread_ids, interval=60.0):
+        """Start a background TTLSweeper for `thread_ids`; call `stop()` on it when done."""
+        return TTLSweeper(self, project_id, thread_ids, interval=interval).start()
+
+    def compact(self, project_id, thread_id, assistant_id=None, name=None):
+        """
+        Copy the live values of a thread (without tombstones, expired keys or
+        stale expiry entries) into a new thread and return the new thread id.
+
+        Thread state never shrinks, so a thread holding many short-lived keys
+        keeps growing until it is compacted. Pending TTLs are carried over.
+        The old thread is left as is; delete it with `client.threads.delete()`
+        once nothing reads it any more.
+        """
+        threads = self.client.threads
+        if assistant_id is None or name is None:
+            info = threads.get(project_id, thread_id) or {}
+            assistant_id = assistant_id or info.get("assistant_id")
+            name = name or info.get("name") or thread_id
+        values = self.decode_values(threads.get_state(project_id, thread_id).get("values") or {})
+        live = dict(visible(values))
+        live.update(live_entries(values, live))
+        new_thread_id = threads.create(project_id, name, assistant_id)["thread_id"]
+        if live:
+            self.update(project_id, new_thread_id, live)
+        self.client.metrics.incr("db.compact.keys_dropped", len(values) - len(live))
+        return new_thread_id
+
+    # --- Value codec ---
+
+    def enable_codec(self, threshold=16 * 1024, chunk_size=256 * 1024, algorithm=None):
+        """
+        Compress values larger than `threshold` bytes and split them into
+        `chunk_size` chunk keys when needed. Smaller values stay plain JSON.
+        `algorithm` is "zstd" (needs zstandard) or "zlib"; defaults to zstd when available.
+        """
+        self.codec = ValueCodec(threshold=threshold, chunk_size=chunk_size, algorithm=algorithm)
+        self._chunk_index = {}
+        return self.codec
+
+    def disable_codec(self):
+        """Write values as plain JSON again. Existing envelopes are still decoded on read."""
+        self.codec = None
+
+    @property
+    def _reader(self):
+        return self.codec or _ENVELOPE_READER
+
+    def _chunked_values(self, project_id, thread_id, data):
+        """
+        Current envelopes of the keys about to be written, so `encode()` clears
+        the chunks of the values they replace. Served from the cache or the
+        local chunk index; a thread seen for the first time is read once.
+        """
+        entry = self.cache.lookup(thread_id) if self.cache is not None else None
+        if entry is not None and isinstance(entry.state.get("values"), dict):
+            values = entry.state["values"]
+            return {k: values[k] for k in data if is_envelope(values.get(k))}
+        index = self._chunk_index.get(thread_id)
+        if index is None:
+            state = self.client.threads.get_state(project_id, thread_id) or {}
+            values = state.get("values") if isinstance(state.get("values"), dict) else {}
+            index = self._chunk_index[thread_id] = {}
+            self._index_chunks(thread_id, values)
+        return {k: index[k] for k in data if k in index}
+
+    def _index_chunks(self, thread_id, values):
+        """Remember which keys of a thread are stored as chunked envelopes."""
+        index = self._chunk_index.get(thread_id)
+        if index is None:
+            return
+        for key, value in values.items():
+            if is_chunk_key(key):
+                continue
+            if is_envelope(value) and value.get("chunks"):
+                index[key] = {CODEC_MARKER: 1, "gen": value["gen"], "chunks": value["chunks"]}
+            else:
+                index.pop(key, None)
+
+    def decode_values(self, values):
+        """Decode codec envelopes in raw thread values and hide chunk keys."""
+        if not isinstance(values, dict):
+            return values
+        if not any(is_envelope(v) or is_chunk_key(k) for k, v in values.items()):
+            return values
+        return self._reader.decode_all(values)
+
+    # --- Optimistic concurrency ---
+
+    def transaction(self, project_id, thread_id, fn, retries=5, backoff=0.05):
+        """
+        Run `fn(values)` as an optimistic read-modify-write, retrying on conflict.
+
+        Usage:
+            def add_item(values):
+                values.setdefault("items", []).append(item)
+            client.db.transaction(project_id, thread_id, add_item)
+
+        Returns:
+            The committed values. Raises ConflictError when retries are exhausted.
+        """
+        return Transaction(self, project_id, thread_id, retries=retries, backoff=backoff).run(fn)
+
+    def compare_and_set(self, project_id, thread_id, key, expected, new, retries=5):
+        """
+        Set `key` to `new` only if its current value equals `expected`.
+
+        Returns:
+            True if the value was set (or already equal to `new`), False if the
+            current value did not match `expected`.
+        """
+        outcome = {}
+
+        def apply(values):
+            outcome["matched"] = fingerprint(values.get(key)) == fingerprint(expected)
+            if outcome["matched"]:
+                values[key] = new
+
+        self.transaction(project_id, thread_id, apply, retries=retries)
+        return outcome["matched"]
+
+    # --- Write-behind ---
+
+    @property
+    def writer(self):
+        """Shared background writer used by `buffered()` (created on first use)."""
+        if self._writer is None:
+            self._writer = WriteBehindWriter(self)
+        return self._writer
+
+    @writer.setter
+    def writer(self, writer):
+        self._writer = writer
+
+    def buffered(self, project_id, thread_id):
+        """
+        Return a write-behind handle for a thread.
+
+        Usage:
+            with client.db.buffered(project_id, thread_id) as buf:
+                for key, value in rows:
+                    buf.set(key, value)   # coalesced into one state update
+        """
+        return BufferedThread(self.writer, project_id, thread_id)
+
+    def flush(self, project_id=None, thread_id=None):
+        """
+        Send all buffered writes and wait for them: of one thread when
+        `thread_id` is given (in any project unless `project_id` is), otherwise all.
+        """
+        if self._writer is not None:
+            self._writer.flush(project_id, thread_id)
+
+    # --- Atomic batches ---
+
+    def batch(self, project_id, thread_id):
+        """
+        Stage a multi-key write applied in a single state update.
+
+        Usage:
+            with client.db.batch(project_id, thread_id) as batch:
+                batch.set("order", order)
+                batch.set("stock", stock)
+        """
+        if self._journal is None:
+            self.enable_journal()
+        return Batch(self, project_id, thread_id, self._journal)
+
+    def enable_journal(self, path=None):
+        """
+        Use the batch journal under `path` (`.epsimo/journal` by default) and
+        replay batches a crashed process left uncommitted there.
+        """
+        self._journal = Journal(path)
+        self._journal.replay(self)
+        return self._journal
+
+    # --- Read replicas ---
+
+    def replica(self, project_id, thread_ids, refresh_interval=5.0, max_staleness=30.0):
+        """
+        Keep `thread_ids` fully in memory and serve reads without network calls.
+
+        Usage:
+            config = client.db.replica(project_id, [config_thread], max_staleness=10)
+            config.get(config_thread, "feature_flags")
+            config.stop()
+        """
+        return ReadReplica(self, project_id, thread_ids, refresh_interval=refresh_interval,
+                           max_staleness=max_staleness).start()
+
+    # --- Mergeable values ---
+
+    def crdt(self, project_id, thread_id, key, type="pncounter", writer_id=None):
+        """
+        Open a conflict-free value: "gcounter", "pncounter", "orset" or "lwwmap".
+
+        Each writer updates only its own slot, so concurrent writers never
+        conflict and never retry; `get()` / `get_all()` return the merged value.
+
+        `writer_id` defaults to `self.writer_id`, a random id per client. Every
+        id leaves a slot in the state, so long-lived workers should set a
+        stable id unique to each concurrent writer (e.g. "<host>-<worker>").
+
+        Usage:
+            hits = client.db.crdt(project_id, thread_id, "hits")
+            hits.increment()
+            hits.value()
+        """
+        if type not in CRDT_TYPES:
+            raise ValueError(f"Unknown CRDT type '{type}' (expected one of {', '.join(CRDT_TYPES)})")
+        writer_id = writer_id or self.writer_id
+        handle_key = (project_id, thread_id, key, writer_id)
+        handle = self._crdts.get(handle_key)
+        if handle is None:
+            # One handle per slot, so a process never overwrites its own slot with a stale copy.
+            handle = self._crdts.setdefault(
+                handle_key, CRDT_TYPES[type](self, project_id, thread_id, key, writer_id=writer_id)
+            )
+        if handle.type_name != type:
+            raise ValueError(f"'{key}' is already open as a {handle.type_name}")
+        return handle
+
+    # --- Collections ---
+
+    def collection(self, project_id, name, shards=None, assistant_id=None, manifest_thread_id=None):
+        """
+        Open (or create) a sharded collection spread over `shards` threads.
+        `assistant_id` is only needed to create the backing threads; pass
+        `manifest_thread_id` to skip the thread listing used to find the manifest.
+        """
+        return Collection.open(self, project_id, name, shards=shards, assistant_id=assistant_id,
+                               manifest_thread_id=manifest_thread_id)
+
+    # --- Secondary index ---
+
+    def index(self, project_id, paths=None, path=None, max_workers=8):
+        """
+        Open the local SQLite index of `paths` (dotted key paths) across all
+        threads of a project. Call `refresh()` on it to crawl changed threads.
+        """
+        return StateIndex(self, project_id, paths=paths, path=path, max_workers=max_workers)
+
+    # --- Change feed ---
+
+    def watch(self, project_id, thread_ids, keys=None, min_interval=1.0, max_interval=30.0):
+        """
+        Yield change events for `thread_ids`, optionally restricted to `keys`.
+
+        Usage:
+            for event in client.db.watch(project_id, [t1, t2], keys=["status"]):
+                print(event["thread_id"], event["changes"])
+        """
+        return Watcher(self, project_id, thread_ids, keys=keys,
+                       min_interval=min_interval, max_interval=max_interval)
+
+    # --- History ---
+
+    def enable_history(self, path=None, checkpoint_every=100):
+        """
+        Keep a local delta log of every state fetched from the server (reads,
+        `snapshot()` and `watch()`), stored under `.epsimo/history` by default.
+        """
+        self.history = HistoryLog(path, checkpoint_every=checkpoint_every)
+        return self.history
+
+    def snapshot(self, project_id, thread_id):
+        """Fetch the current state and record it in the history log."""
+        if self.history is None:
+            self.enable_history()
+        state = self.client.threads.get_state(project_id, thread_id)
+        return self.history.record(thread_id, self.decode_values(state.get("values", {})))
+
+    def state_at(self, thread_id, timestamp=None):
+        """Reconstruct a thread's values as of `timestamp` (epoch seconds) from the history log."""
+        if self.history is None:
+            self.enable_history()
+        return self.history.state_at(thread_id, timestamp)
+
+    def restore(self, project_id, thread_id, timestamp, dry_run=False):
+        """
+        Roll a thread back to its recorded values as of `timestamp`.
+        Only keys that differ are written; keys added since are set to None.
+
+        The history holds stored values (CRDT slots, expiry entries and
+        tombstones), so they are compared with the stored values, not with
+        the merged view of `get_all()`. `dry_run` returns the changes unsent.
+        """
+        values = self.state_at(thread_id, timestamp)
+        if values is None:
+            raise ValueError(f"No history recorded for thread {thread_id} at that time")
+        base = self._raw_values(project_id, thread_id)
+        if dry_run:
+            return diff_values(base, values, delete_missing=True)
+        changes = self.patch(project_id, thread_id, values, base=base, delete_missing=True)
+        # Open CRDT handles keep a copy of their slot; make them re-read the restored one.
+        for (handle_project, handle_thread, _, _), handle in list(self._crdts.items()):
+            if handle_project == project_id and handle_thread == thread_id:
+                handle.reset()
+        return changes
+
+    def _observe(self, thread_id, state):
+        if self.history is not None and isinstance(state, dict):
+            self.history.record(thread_id, self.decode_values(state.get("values", {})))
+        return state
+
+    # --- Export / import ---
+
+    def export_project(self, project_id, output, format=None, concurrency=8, resume=False, on_progress=None):
+        """Stream every thread state of a project to a JSONL(.gz) or Parquet file."""
+        return export_project(self, project_id, output, format=format, concurrency=concurrency,
+                              resume=resume, on_progress=on_progress)
+
+    def import_project(self, project_id, input, format=None, concurrency=8, assistant_id=None, resume=False,
+                       on_progress=None):
+        """Write thread states from an export file into a project."""
+        return import_project(self, project_id, input, format=format, concurrency=concurrency,
+                              assistant_id=assistant_id, resume=resume, on_progress=on_progress)
+
+    # --- Diff-based writes ---
+
+    def patch(self, project_id, thread_id, values, base=None, delete_missing=False):
+        """
+        Write only the top-level keys of `values` that differ from the current state.
+
+        Args:
+            values: Desired values (typically the full document after local edits).
+            base: Last known values to diff against. Defaults to the current
+                  thread values (served from the cache when enabled).
+            delete_missing: Set keys absent from `values` to None.
+
+        Returns:
+            The dict of changed keys that was sent (empty when nothing changed).
+        """
+        if base is None:
+            base = self.get_all(project_id, thread_id)
+        changes = diff_values(base, values, delete_missing=delete_missing)
+        self._record_patch(changes, len(values) - len(changes))
+        if changes:
+            self.update(project_id, thread_id, changes)
+        return changes
+
+    def track(self, project_id, thread_id):
+        """Load the thread values into a TrackedDocument whose `save()` sends only changes."""
+        values = self.get_all(project_id, thread_id)
+        return TrackedDocument(self, project_id, thread_id, values if isinstance(values, dict) else {})
+
+    def _record_patch(self, changes, skipped):
+        metrics = self.client.metrics
+        metrics.incr("db.patch.keys_sent", len(changes))
+        metrics.incr("db.patch.keys_skipped", max(skipped, 0))
+        if not changes:
+            metrics.incr("db.patch.noop")
@@ -1,38 +1,299 @@
 import os
+import threading
+import time
+
+from ..filemanifest import FileManifest, remote_file_id, remote_file_name, remote_files
+from ..multipart import MultipartEncoder
+from ..resumable import ChunkedUploadUnsupported, ResumableUpload, is_retryable
+from ..vdb.transfer import bounded_map
+
+
+def _collect_paths(paths):
+    """Expand a directory (or a list mixing files and directories) into file paths, skipping hidden entries."""
+    if isinstance(paths, (str, os.PathLike)):
+        paths = [paths]
+    collected = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs[:] = sorted(d for d in dirs if not d.startswith("."))
+                collected.extend(os.path.join(root, f) for f in sorted(files) if not f.startswith("."))
+        else:
+            collected.append(path)
+    return collected
+
+
+def _skipped(path, size, file_id):
+    return {"path": path, "status": "skipped", "file_id": file_id, "attempts": 0, "bytes": size, "error": None}
+
 
 class Files:
     def __init__(self, client):
         self.client = client
+        self._chunked_unsupported = False
 
     def list(self, project_id, assistant_id):
         """List files attached to an assistant."""
         headers = self.client.get_project_headers(project_id)
         return self.client.request("GET", f"/assistants/{assistant_id}/files", headers=headers)
 
-    def upload(self, project_id, assistant_id, file_path):
-        """Upload a file to an assistant."""
+    def upload(self, project_id, assistant_id, file_path, on_progress=None, chunk_size=1024 * 1024):
+        """
+        Upload a file to an assistant.
+
+        The multipart body is streamed from disk in `chunk_size` pieces, so
+        memory use stays flat whatever the file size. `on_progress(sent, total)`
+        is called as bytes are sent.
+        """
         headers = self.client.get_project_headers(project_id)
-        # requests handles Content-Type for files
-        # We need to act directly on the session or expose a clean method in client
-        
-        # client.request takes json/params but not files explicitly in my simple wrapper
-        # Let's bypass wrapper slightly or extend it, but here we construct full URL
-        # reusing client.base_url
-        
-        url = f"{self.client.base_url}/assistants/{assistant_id}/files"
-        
-        # We need to strip standard JSON content type if present
-        # but headers only has Auth here.
-        
-        with open(file_path, 'rb') as f:
-            files = {'files': (os.path.basename(file_path), f)}
-            # accessing _session directly for file upload flexibility
-            resp = self.client._session.post(url, headers=headers, files=files)
-            
-        if not resp.ok:
-            resp.raise_for_status()
+        with MultipartEncoder({"files": file_path}, chunk_size=chunk_size, on_progress=on_progress) as body:
+            headers["Content-Type"] = body.content_type
+            resp = self.client.request_raw("POST", f"/assistants/{assistant_id}/files", data=body, headers=headers)
+
+        metrics = self.client.metrics
+        metrics.incr("files.upload.bytes", body.sent)
+        metrics.gauge("files.upload.throughput", body.throughput)
         return resp.json()
 
+    def upload_resumable(self, project_id, assistant_id, file_path, chunk_size=8 * 1024 * 1024, retries=5,
+                         on_progress=None, state_dir=None):
+        """
+        Upload a file in chunks that are retried individually; an interrupted
+        upload continues from the last chunk sent when called again. Falls
+        back to `upload()` when the server has no chunked upload API.
+        """
+        if not self._chunked_unsupported:
+            try:
+                return ResumableUpload(self.client, project_id, assistant_id, file_path, chunk_size=chunk_size,
+                                       retries=retries, state_dir=state_dir, on_progress=on_progress).run()
+            except ChunkedUploadUnsupported:
+                self._chunked_unsupported = True
+        self.client.metrics.incr("files.upload.single_shot_fallbacks")
+        return self.upload(project_id, assistant_id, file_path, on_progress=on_progress)
+
+    def upload_many(self, project_id, assistant_id, paths, concurrency=4, retries=3, backoff=1.0,
+                    on_progress=None, dedup=False, manifest_path=None, resumable_over=None):
+        """
+        Upload many files (or every file of a directory) on a worker pool.
+
+        All workers share the client session, project token and rate limiter.
+        Network errors, 429 and 5xx responses are retried with exponential
+        backoff. `on_progress(files_done, files_total, bytes_sent, bytes_total)`
+        reports aggregate progress.
+
+        With `dedup=True`, files are hashed (sha256, in parallel) and content
+        already attached to the assistant according to the local manifest
+        (`.epsimo/files/<assistant_id>.json`, checked against `list()`) is
+        skipped, as are duplicates within `paths`. Files larger than
+        `resumable_over` bytes go through `upload_resumable()`.
+
+        Returns:
+            Manifest dict: {"uploaded", "skipped", "failed", "bytes", "seconds",
+            "results": [{"path", "status", "file_id", "attempts", "bytes", "error"}]}
+        """
+        paths = _collect_paths(paths)
+        sizes = {path: os.path.getsize(path) for path in paths}
+        lock = threading.Lock()
+        progress = {"files": 0, "bytes": 0}
+        started = time.monotonic()
+
+        manifest, digests, skipped, duplicates = None, {}, [], []
+        if dedup:
+            manifest = FileManifest(assistant_id, path=manifest_path)
+            manifest.reconcile(self.list(project_id, assistant_id))
+            digests = manifest.hash_paths(paths)
+            first = {}
+            for path in paths:
+                entry = manifest.lookup(digests[path])
+                if entry is not None:
+                    skipped.append(_skipped(path, sizes[path], entry["file_id"]))
+                elif digests[path] in first:
+                    duplicates.append(path)
+                else:
+                    first[digests[path]] = path
+            paths = list(first.values())
+            progress["files"] = len(skipped) + len(duplicates)
+            self.client.metrics.incr("files.upload.deduplicated", progress["files"])
+        total_files = len(paths) + progress["files"]
+        total_bytes = sum(sizes[path] for path in paths)
+
+        def report(done_file=False, sent=0):
+            with lock:
+                progress["bytes"] += sent
+                progress["files"] += 1 if done_file else 0
+                snapshot = (progress["files"], total_files, progress["bytes"], total_bytes)
+            if on_progress:
+                on_progress(*snapshot)
+
+        def upload_one(path):
+            result = {"path": path, "status": "failed", "file_id": None, "attempts": 0, "bytes": sizes[path], "error": None}
+            for attempt in range(retries + 1):
+                result["attempts"] = attempt + 1
+                sent = [0]
+
+                def file_progress(done, total):
+                    done = min(done, sizes[path])  # ignore multipart framing bytes
+                    report(sent=done - sent[0])
+                    sent[0] = done
+
+                try:
+                    if resumable_over is not None and sizes[path] > resumable_over:
+                        response = self.upload_resumable(project_id, assistant_id, path, on_progress=file_progress)
+                    else:
+                        response = self.upload(project_id, assistant_id, path, on_progress=file_progress)
+                except Exception as e:
+                    report(sent=-sent[0])  # this attempt's bytes will be sent again
+                    result["error"] = str(e)
+                    if attempt == retries or not is_retryable(e):
+                        break
+                    self.client.metrics.incr("files.upload.retries")
+                    time.sleep(backoff * 2 ** attempt)
+                    continue
+                result.update(status="uploaded", file_id=remote_file_id(response), error=None)
+                break
+            report(done_file=True)
+            return result
+
+        results = list(bounded_map(upload_one, paths, concurrency=concurrency))
+        if manifest is not None:
+            by_digest = {}
+            for result in results:
+                if result["status"] == "uploaded":
+                    digest = digests[result["path"]]
+                    manifest.record(digest, result["file_id"], os.path.basename(result["path"]), result["bytes"])
+                    by_digest[digest] = result["file_id"]
+            for path in duplicates:
+                if digests[path] in by_digest:
+                    skipped.append(_skipped(path, sizes[path], by_digest[digests[path]]))
+                else:
+                    results.append(dict(_skipped(path, sizes[path], None), status="failed",
+                                        error="identical file failed to upload"))
+            manifest.save()
+        results = sorted(results + skipped, key=lambda r: r["path"])
+        uploaded = sum(1 for r in results if r["status"] == "uploaded")
+        return {
+            "uploaded": uploaded,
+            "skipped": len(skipped),
+            "failed": len(results) - uploaded - len(skipped),
+            "bytes": sum(r["bytes"] for r in results if r["status"] == "uploaded"),
+            "seconds": round(time.monotonic() - started, 3),
+            "results": results,
+        }
+
+    def sync(self, project_id, assistant_id, directory, concurrency=4, prune=False, dry_run=False,
+             on_progress=None, on_plan=None, manifest_path=None):
+        """
+        Make the assistant's files mirror a local directory.
+
+        Files are matched by their path relative to `directory`. New and
+        changed files (by size/mtime, then sha256) are uploaded, unless the
+        manifest shows their content is already attached (e.g. uploaded by
+        `upload_many(dedup=True)`), and the remote copies of changed and
+        removed files are deleted. Only files this sync uploaded before (or
+        named like a top-level local file) are deleted, unless `prune=True`,
+        which deletes every other remote file too. An unchanged tree costs one `list()` call and a `stat()` per file.
+        `on_plan(plan)` is called before anything is changed.
+
+        Returns:
+            Plan dict {"upload": [names], "update": [names], "delete": [{"file_id", "name"}],
+            "unchanged": n}, plus "result" (the `upload_many` manifest),
+            "deleted" and "delete_errors" once executed (not with `dry_run=True`).
+        """
+        manifest = FileManifest(assistant_id, path=manifest_path)
+        listing = remote_files(self.list(project_id, assistant_id))
+        manifest.reconcile(listing)
+        remote_ids = {remote_file_id(f): remote_file_name(f) for f in listing}
+        remote_ids.pop(None, None)
+        by_name = {}
+        for file_id, name in remote_ids.items():
+            by_name.setdefault(name, []).append(file_id)
+
+        local = {os.path.relpath(path, directory).replace(os.sep, "/"): path for path in _collect_paths(directory)}
+        digests = manifest.hash_paths(list(local.values()))
+
+        plan = {"upload": [], "update": [], "delete": [], "unchanged": 0}
+        replaced = {}  # name -> remote file ids to delete once the new version is uploaded
+        adopted = {}  # name -> remote file already holding its content (uploaded, never synced)
+        kept = set()
+        # A remote file backs at most one path, so deleting it for one never removes another's.
+        claimed = {entry["file_id"] for entry in manifest.synced.values()}
+        for name, path in sorted(local.items()):
+            previous = manifest.synced.get(name)
+            if previous and previous["file_id"] in remote_ids and previous["sha256"] == digests[path]:
+                plan["unchanged"] += 1
+                kept.add(previous["file_id"])
+                continue
+            known = manifest.lookup(digests[path])
+            if known and known["file_id"] in remote_ids and known["file_id"] not in claimed:
+                adopted[name] = known["file_id"]
+                claimed.add(known["file_id"])
+            if previous and previous["file_id"] in remote_ids:
+                stale = [previous["file_id"]]
+            else:
+                # Remote files only carry a base name, so only top-level files can match by name.
+                stale = [file_id for file_id in by_name.get(name, []) if file_id not in claimed]
+            claimed.update(stale)
+            if name in adopted:
+                plan["unchanged"] += 1
+            elif stale:
+                plan["update"].append(name)
+            else:
+                plan["upload"].append(name)
+            replaced[name] = stale
+        kept.update(file_id for ids in replaced.values() for file_id in ids)
+        kept.update(adopted.values())
+
+        for name, entry in sorted(manifest.synced.items()):
+            if name not in local and entry["file_id"] in remote_ids:
+                plan["delete"].append({"file_id": entry["file_id"], "name": remote_ids[entry["file_id"]]})
+                kept.add(entry["file_id"])
+        if prune:
+            plan["delete"].extend({"file_id": file_id, "name": name}
+                                  for file_id, name in sorted(remote_ids.items()) if file_id not in kept)
+        if on_plan:
+            on_plan(plan)
+        if dry_run:
+            manifest.save()  # keeps the computed hashes for the real run
+            return plan
+
+        deletions = [d["file_id"] for d in plan["delete"]]
+        for name, file_id in adopted.items():
+            manifest.record_sync(name, digests[local[name]], file_id)
+            deletions.extend(replaced[name])
+        to_upload = plan["upload"] + plan["update"]
+        result = self.upload_many(project_id, assistant_id, [local[name] for name in to_upload],
+                                  concurrency=concurrency, on_progress=on_progress)
+        uploaded = {r["path"]: r for r in result["results"] if r["status"] == "uploaded"}
+        for name in to_upload:
+            path = local[name]
+            if path in uploaded:
+                file_id = uploaded[path]["file_id"]
+                manifest.record(digests[path], file_id, os.path.basename(path), os.path.getsize(path))
+                manifest.record_sync(name, digests[path], file_id)
+                # The old version goes only once the new one is in place.
+                deletions.extend(replaced.get(name, []))
+
+        def delete_one(file_id):
+            try:
+                self.delete(project_id, assistant_id, file_id)
+                return file_id, None
+            except Exception as e:
+                return file_id, str(e)
+
+        deleted, errors = [], []
+        for file_id, error in bounded_map(delete_one, list(dict.fromkeys(deletions)), concurrency=concurrency):
+            if error:
+                errors.append({"file_id": file_id, "error": error})
+            else:
+                deleted.append(file_id)
+        for name, entry in list(manifest.synced.items()):
+            if name not in local and (entry["file_id"] in deleted or entry["file_id"] not in remote_ids):
+                manifest.forget_sync(name)
+        manifest.save()
+
+        plan.update(result=result, deleted=deleted, delete_errors=errors)
+        return plan
+
     def delete(self, project_id, assistant_id, file_id):
         """Delete a file from an assistant."""
         headers = self.client.get_project_headers(project_id)
@@ -3,6 +3,23 @@ import json
 class Threads:
     def __init__(self, client):
         self.client = client
+        self._value_listeners = []
+
+    def subscribe_values(self, listener):
+        """
+        Register `listener(thread_id, values)` to receive the `values` chunks of
+        runs streamed through this client. It is called with `values=None`
+        when a run ends.
+        """
+        self._value_listeners.append(listener)
+
+    def unsubscribe_values(self, listener):
+        if listener in self._value_listeners:
+            self._value_listeners.remove(listener)
+
+    def _publish_values(self, thread_id, values):
+        for listener in list(self._value_listeners):
+            listener(thread_id, values)
 
     def list(self, project_id):
         """List threads in a project."""
@@ -24,14 +41,41 @@ class Threads:
         headers = self.client.get_project_headers(project_id)
         return self.client.request("GET", f"/threads/{thread_id}", headers=headers)
 
+    def delete(self, project_id, thread_id):
+        """Delete a thread."""
+        headers = self.client.get_project_headers(project_id)
+        return self.client.request("DELETE", f"/threads/{thread_id}", headers=headers)
+
     def get_state(self, project_id, thread_id):
         """Retrieve the structured state (values) of a thread."""
         headers = self.client.get_project_headers(project_id)
         return self.client.request("GET", f"/threads/{thread_id}/state", headers=headers)
 
-    def set_state(self, project_id, thread_id, values, config=None):
-        """Update the structured state (values) of a thread."""
+    def get_state_if_changed(self, project_id, thread_id, etag=None):
+        """
+        Conditionally retrieve the thread state.
+
+        Returns:
+            (state, etag) tuple. `state` is None when the server answered
+            304 Not Modified for the given `etag`.
+        """
+        headers = self.client.get_project_headers(project_id)
+        if etag:
+            headers["If-None-Match"] = etag
+        response = self.client.request_raw("GET", f"/threads/{thread_id}/state", headers=headers)
+        if response.status_code == 304:
+            return None, etag
+        return response.json(), response.headers.get("ETag")
+
+    def set_state(self, project_id, thread_id, values, config=None, if_match=None):
+        """
+        Update the structured state (values) of a thread.
+        `if_match` sends an If-Match header so the server can reject the write
+        (409/412) when the state ETag changed.
+        """
         headers = self.client.get_project_headers(project_id)
+        if if_match:
+            headers["If-Match"] = if_match
         payload = {
             "values": values,
             "config": config or {}
@@ -70,14 +114,27 @@ class Threads:
         response = self.client._session.post(url, json=payload, headers=headers, stream=True)
         response.raise_for_status()
 
-        for line in response.iter_lines():
-            if line:
-                decoded = line.decode('utf-8')
-                if decoded.startswith("data:"):
-                    data_str = decoded[5:].strip()
-                    if data_str == "[DONE]":
-                        break
-                    try:
-                        yield json.loads(data_str)
-                    except json.JSONDecodeError:
-                        yield {"raw": data_str, "error": "json_decode_error"}
+        event = None
+        try:
+            for line in response.iter_lines():
+                if line:
+                    decoded = line.decode('utf-8')
+                    if decoded.startswith("event:"):
+                        event = decoded[6:].strip()
+                    elif decoded.startswith("data:"):
+                        data_str = decoded[5:].strip()
+                        if data_str == "[DONE]":
+                            break
+                        try:
+                            chunk = json.loads(data_str)
+                        except json.JSONDecodeError:
+                            yield {"raw": data_str, "error": "json_decode_error"}
+                            continue
+                        # Without SSE event names only a values-only stream is unambiguous.
+                        is_values = event == "values" or (event is None and payload["stream_mode"] == ["values"])
+                        if self._value_listeners and is_values and isinstance(chunk, dict):
+                            self._publish_values(thread_id, chunk)
+                        yield chunk
+        finally:
+            if self._value_listeners:
+                self._publish_values(thread_id, None)
@@ -0,0 +1,155 @@
+import hashlib
+import json
+import os
+import time
+
+import requests
+
+DEFAULT_UPLOADS_DIR = os.path.join(".epsimo", "uploads")
+
+# Answers to the upload-session request meaning "no chunked upload API here".
+UNSUPPORTED_STATUSES = (404, 405, 501)
+
+
+class ChunkedUploadUnsupported(Exception):
+    pass
+
+
+def is_retryable(error):
+    """Network errors, throttling and server errors are worth retrying; other 4xx are not."""
+    if isinstance(error, requests.HTTPError) and error.response is not None:
+        return error.response.status_code == 429 or error.response.status_code >= 500
+    return isinstance(error, (requests.ConnectionError, requests.Timeout))
+
+
+class ResumableUpload:
+    """
+    Chunked upload of one file that survives interruptions.
+
+    Protocol (relative to `/assistants/{assistant_id}`):
+        POST uploads                     {"filename", "size", "chunk_size"} -> {"upload_id"}
+        GET  uploads/{upload_id}         -> {"received": [chunk indexes]}
+        PUT  uploads/{upload_id}/chunks/{i}   raw bytes of chunk i
+        POST uploads/{upload_id}/complete     -> the uploaded file
+
+    Chunks are retried individually. The upload id and the chunks already
+    sent are saved under `.epsimo/uploads`, so running the same upload again
+    (same file, size and mtime) only sends the missing chunks. A server
+    without this API answers 404/405/501 to the first request, which raises
+    `ChunkedUploadUnsupported`.
+    """
+    def __init__(self, client, project_id, assistant_id, file_path, chunk_size=8 * 1024 * 1024,
+                 retries=5, backoff=1.0, state_dir=None, on_progress=None):
+        self.client = client
+        self.project_id = project_id
+        self.assistant_id = assistant_id
+        self.file_path = file_path
+        self.chunk_size = chunk_size
+        self.retries = retries
+        self.backoff = backoff
+        self.on_progress = on_progress
+        self.size = os.path.getsize(file_path)
+        stat = os.stat(file_path)
+        key = f"{assistant_id}|{os.path.abspath(file_path)}|{stat.st_size}|{stat.st_mtime_ns}"
+        self.state_path = os.path.join(state_dir or DEFAULT_UPLOADS_DIR,
+                                       hashlib.sha1(key.encode("utf-8")).hexdigest() + ".json")
+
+    @property
+    def base(self):
+        return f"/assistants/{self.assistant_id}/uploads"
+
+    def run(self):
+        """Send the missing chunks and complete the upload; returns the server's file response."""
+        state = self._start()
+        chunks = (self.size + state["chunk_size"] - 1) // state["chunk_size"] or 1
+        done = set(state["received"])
+        sent = sum(self._chunk_length(i, state["chunk_size"]) for i in done)
+        if done:
+            self.client.metrics.incr("files.upload.resumed_bytes", sent)
+
+        with open(self.file_path, "rb") as f:
+            for index in range(chunks):
+                if index in done:
+                    continue
+                f.seek(index * state["chunk_size"])
+                data = f.read(state["chunk_size"])
+                self._with_retries(lambda: self._request(
+                    "PUT", f"{self.base}/{state['upload_id']}/chunks/{index}", data=data,
+                    headers={"Content-Type": "application/octet-stream"},
+                ))
+                done.add(index)
+                sent += len(data)
+                state["received"] = sorted(done)
+                self._save(state)
+                self.client.metrics.incr("files.upload.chunks")
+                if self.on_progress:
+                    self.on_progress(sent, self.size)
+
+        response = self._with_retries(lambda: self._request("POST", f"{self.base}/{state['upload_id']}/complete"))
+        self._clear()
+        return response.json()
+
+    # --- Internals ---
+
+    def _start(self):
+        state = self._load()
+        if state is not None:
+            try:
+                response = self._request("GET", f"{self.base}/{state['upload_id']}",
+                                         allow_status=UNSUPPORTED_STATUSES)
+            except requests.RequestException:
+                return state  # trust the local record; failed chunks are retried anyway
+            if response.status_code not in UNSUPPORTED_STATUSES:
+                state["received"] = response.json().get("received", state["received"])
+                return state
+            self._clear()  # expired or unknown session: start over
+
+        response = self._with_retries(lambda: self._request(
+            "POST", self.base, allow_status=UNSUPPORTED_STATUSES,
+            json={"filename": os.path.basename(self.file_path), "size": self.size, "chunk_size": self.chunk_size},
+        ))
+        if response.status_code in UNSUPPORTED_STATUSES:
+            raise ChunkedUploadUnsupported(f"Server has no chunked upload API (HTTP {response.status_code})")
+        session = response.json()
+        state = {"upload_id": session["upload_id"], "chunk_size": session.get("chunk_size") or self.chunk_size,
+                 "received": session.get("received", [])}
+        self._save(state)
+        return state
+
+    def _request(self, method, path, **kwargs):
+        headers = self.client.get_project_headers(self.project_id)
+        headers.update(kwargs.pop("headers", None) or {})
+        return self.client.request_raw(method, path, headers=headers, **kwargs)
+
+    def _with_retries(self, send):
+        for attempt in range(self.retries + 1):
+            try:
+                return send()
+            except Exception as e:
+                if attempt == self.retries or not is_retryable(e):
+                    raise
+                self.client.metrics.incr("files.upload.chunk_retries")
+                time.sleep(self.backoff * 2 ** attempt)
+
+    def _chunk_length(self, index, chunk_size):
+        return max(0, min(chunk_size, self.size - index * chunk_size))
+
+    def _load(self):
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _save(self, state):
+        os.makedirs(os.path.dirname(self.state_path), exist_ok=True)
+        tmp = self.state_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+        os.replace(tmp, self.state_path)
+
+    def _clear(self):
+        try:
+            os.remove(self.state_path)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1 @@
+"""Building blocks for the Virtual Database (thread state used as storage)."""
@@ -0,0 +1,219 @@
+import atexit
+import threading
+import time
+
+
+class _Pending:
+    __slots__ = ("values", "since", "error", "flushing")
+
+    def __init__(self):
+        self.values = {}
+        self.since = None
+        self.error = None
+        self.flushing = False
+
+
+class WriteBehindWriter:
+    """
+    Background writer that coalesces Virtual DB writes.
+
+    Writes are merged per thread (repeated writes to a key keep only the last
+    value) and sent as a single state update once a thread has `max_keys`
+    pending keys or its oldest pending write is `max_delay` seconds old.
+
+    A failed background flush keeps its values pending and pauses that thread;
+    the error is raised by the next `set()`, `update()` or `flush()` call for
+    the thread, so failures surface at a predictable point in the caller.
+    """
+    def __init__(self, db, max_keys=50, max_delay=0.5):
+        self.db = db
+        self.max_keys = max_keys
+        self.max_delay = max_delay
+        self._cond = threading.Condition()
+        self._threads = {}
+        self._worker = None
+        self._closed = False
+        self._registered = False
+
+    def set(self, project_id, thread_id, key, value):
+        """Queue a single key write."""
+        self.update(project_id, thread_id, {key: value})
+
+    def update(self, project_id, thread_id, data):
+        """Queue a multi-key write."""
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("WriteBehindWriter is closed")
+            pending = self._threads.setdefault((project_id, thread_id), _Pending())
+            self._raise_error(pending)
+            if not pending.values:
+                pending.since = time.monotonic()
+            collapsed = sum(1 for key in data if key in pending.values)
+            pending.values.update(data)
+            self._ensure_worker()
+            self._cond.notify_all()
+
+        metrics = self.db.client.metrics
+        metrics.incr("db.buffer.writes", len(data))
+        if collapsed:
+            metrics.incr("db.buffer.collapsed", collapsed)
+
+    def pending(self, project_id, thread_id):
+        """Return a copy of the values queued for a thread."""
+        with self._cond:
+            pending = self._threads.get((project_id, thread_id))
+            return dict(pending.values) if pending else {}
+
+    def flush(self, project_id=None, thread_id=None):
+        """
+        Barrier: send pending writes now and wait for in-flight flushes.
+        Flushes one thread when `thread_id` is given (in any project when
+        `project_id` is None), otherwise all threads. Raises the first error
+        recorded for a flushed thread.
+        """
+        with self._cond:
+            keys = [key for key in self._threads
+                    if thread_id is None or (key[1] == thread_id and project_id in (None, key[0]))]
+        for key in keys:
+            self._flush_one(key, raise_errors=True)
+
+    def close(self):
+        """
+        Stop the background worker and flush everything still pending.
+        The writer stays usable: the next write starts a new worker.
+        """
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+            worker = self._worker
+        if worker is not None and worker is not threading.current_thread():
+            worker.join()
+        try:
+            self.flush()
+        finally:
+            with self._cond:
+                if self._worker is worker:
+                    self._worker = None
+                self._closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    # --- Internals ---
+
+    def _raise_error(self, pending):
+        if pending.error is not None:
+            error, pending.error = pending.error, None
+            raise error
+
+    def _ensure_worker(self):
+        if self._worker is None:
+            self._worker = threading.Thread(target=self._run, name="epsimo-db-writer", daemon=True)
+            self._worker.start()
+            if not self._registered:
+                atexit.register(self.close)
+                self._registered = True
+
+    def _flush_one(self, key, raise_errors):
+        with self._cond:
+            pending = self._threads.get(key)
+            if pending is None:
+                return
+            while pending.flushing:
+                self._cond.wait()
+            if raise_errors:
+                self._raise_error(pending)
+            elif pending.error is not None:
+                return
+            if not pending.values:
+                return
+            batch, pending.values = pending.values, {}
+            pending.flushing = True
+
+        error = None
+        try:
+            self.db.update(key[0], key[1], batch)
+        except Exception as e:
+            error = e
+
+        with self._cond:
+            pending.flushing = False
+            if error is not None:
+                # Keep the failed batch underneath anything written since.
+                pending.values = {**batch, **pending.values}
+                pending.since = time.monotonic()
+                if not raise_errors:
+                    pending.error = error
+            self._cond.notify_all()
+
+        metrics = self.db.client.metrics
+        if error is not None:
+            metrics.incr("db.buffer.errors")
+            if raise_errors:
+                raise error
+        else:
+            metrics.incr("db.buffer.flushes")
+            metrics.incr("db.buffer.keys_flushed", len(batch))
+
+    def _due(self, now):
+        due, wake_at = [], None
+        for key, pending in self._threads.items():
+            if not pending.values or pending.flushing or pending.error is not None:
+                continue
+            deadline = pending.since + self.max_delay
+            if len(pending.values) >= self.max_keys or now >= deadline:
+                due.append(key)
+            elif wake_at is None or deadline < wake_at:
+                wake_at = deadline
+        return due, wake_at
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while True:
+                    if self._closed:
+                        return
+                    now = time.monotonic()
+                    due, wake_at = self._due(now)
+                    if due:
+                        break
+                    self._cond.wait(None if wake_at is None else wake_at - now)
+            for key in due:
+                self._flush_one(key, raise_errors=False)
+
+
+class BufferedThread:
+    """
+    Write-behind handle for a single thread, returned by `Database.buffered()`.
+    Reads see pending writes; leaving the `with` block flushes.
+    """
+    def __init__(self, writer, project_id, thread_id):
+        self.writer = writer
+        self.project_id = project_id
+        self.thread_id = thread_id
+
+    def set(self, key, value):
+        self.writer.set(self.project_id, self.thread_id, key, value)
+
+    def update(self, data):
+        self.writer.update(self.project_id, self.thread_id, data)
+
+    def get(self, key, default=None):
+        pending = self.writer.pending(self.project_id, self.thread_id)
+        if key in pending:
+            return pending[key]
+        return self.writer.db.get(self.project_id, self.thread_id, key, default)
+
+    def flush(self):
+        self.writer.flush(self.project_id, self.thread_id)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.flush()
+        return False
@@ -0,0 +1,123 @@
+import base64
+import hashlib
+import json
+import zlib
+
+try:
+    import zstandard
+except ImportError:  # zstd support is optional
+    zstandard = None
+
+CODEC_MARKER = "__epsimo_codec__"
+CHUNK_PREFIX = "__chunk__/"
+
+
+def is_envelope(value):
+    return isinstance(value, dict) and CODEC_MARKER in value
+
+
+def is_chunk_key(key):
+    return isinstance(key, str) and key.startswith(CHUNK_PREFIX)
+
+
+def chunk_key(key, generation, index):
+    return f"{CHUNK_PREFIX}{key}/{generation}/{index}"
+
+
+class ValueCodec:
+    """
+    Opt-in encoding of large Virtual DB values.
+
+    Values whose JSON encoding is smaller than `threshold` bytes are stored
+    unchanged, so agents and older clients keep reading them as plain JSON.
+    Larger values are compressed (zstd when `zstandard` is installed, zlib
+    otherwise) and stored as a base64 envelope:
+        {"__epsimo_codec__": 1, "alg": "zlib", "size": 123456, "data": "..."}
+    Envelopes larger than `chunk_size` keep only metadata and point to chunk
+    keys (`__chunk__/<key>/<generation>/<i>`), which are written in separate
+    requests before the envelope so readers never see a partial value.
+    """
+    def __init__(self, threshold=16 * 1024, chunk_size=256 * 1024, algorithm=None, level=6):
+        if algorithm is None:
+            algorithm = "zstd" if zstandard is not None else "zlib"
+        if algorithm == "zstd" and zstandard is None:
+            raise RuntimeError("zstd compression requires the zstandard package (pip install zstandard)")
+        if algorithm not in ("zlib", "zstd"):
+            raise ValueError(f"Unsupported algorithm '{algorithm}'")
+        self.threshold = threshold
+        self.chunk_size = chunk_size
+        self.algorithm = algorithm
+        self.level = level
+
+    def encode(self, data, previous=None):
+        """
+        Encode a dict of values for writing.
+
+        Args:
+            data: Values to write.
+            previous: Last known raw values of the thread, used to clear the
+                chunks of values being replaced.
+
+        Returns:
+            List of dicts to send as successive state updates: chunk batches
+            first, the envelopes and plain values last.
+        """
+        previous = previous or {}
+        batches, main = [], {}
+        for key, value in data.items():
+            envelope = None
+            if value is not None:
+                raw = json.dumps(value, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+                if len(raw) >= self.threshold:
+                    envelope, chunks = self._envelope(key, raw)
+                    batches.extend(chunks)
+            main[key] = envelope if envelope is not None else value
+
+            old = previous.get(key)
+            if is_envelope(old) and old.get("chunks") and old.get("gen") != (envelope or {}).get("gen"):
+                for i in range(old["chunks"]):
+                    main[chunk_key(key, old["gen"], i)] = None
+        return batches + [main]
+
+    def decode(self, key, value, values):
+        """Decode one value; `values` is the raw state holding its chunks."""
+        if not is_envelope(value):
+            return value
+        if "data" in value:
+            blob = value["data"]
+        else:
+            try:
+                blob = "".join(values[chunk_key(key, value["gen"], i)] for i in range(value["chunks"]))
+            except (KeyError, TypeError):
+                raise ValueError(f"Value '{key}' is missing chunks")
+        raw = self._decompress(value["alg"], base64.b64decode(blob))
+        return json.loads(raw)
+
+    def decode_all(self, values):
+        """Decode every value and hide chunk keys."""
+        return {k: self.decode(k, v, values) for k, v in values.items() if not is_chunk_key(k)}
+
+    # --- Internals ---
+
+    def _envelope(self, key, raw):
+        blob = base64.b64encode(self._compress(raw)).decode("ascii")
+        envelope = {CODEC_MARKER: 1, "alg": self.algorithm, "size": len(raw)}
+        if len(blob) <= self.chunk_size:
+            envelope["data"] = blob
+            return envelope, []
+        generation = hashlib.sha1(blob.encode("ascii")).hexdigest()[:12]
+        pieces = [blob[i:i + self.chunk_size] for i in range(0, len(blob), self.chunk_size)]
+        envelope.update(gen=generation, chunks=len(pieces))
+        return envelope, [{chunk_key(key, generation, i): piece} for i, piece in enumerate(pieces)]
+
+    def _compress(self, raw):
+        if self.algorithm == "zstd":
+            return zstandard.ZstdCompressor(level=self.level).compress(raw)
+        return zlib.compress(raw, self.level)
+
+    def _decompress(self, algorithm, data):
+        if algorithm == "zstd":
+            if zstandard is None:
+                raise RuntimeError("Reading zstd values requires the zstandard package (pip install zstandard)")
+            return zstandard.ZstdDecompressor().decompress(data)
+        return zlib.decompress(data)
@@ -0,0 +1,306 @@
+import bisect
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+
+MANIFEST_KEY = "vdb_collection"
+_MISSING = object()
+
+
+def _hash(value):
+    return int.from_bytes(hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    """Consistent hash ring mapping keys to shard names, with virtual nodes."""
+    def __init__(self, nodes, vnodes=64):
+        points = sorted((_hash(f"{node}#{i}"), node) for node in nodes for i in range(vnodes))
+        self._hashes = [h for h, _ in points]
+        self._nodes = [node for _, node in points]
+
+    def node_for(self, key):
+        index = bisect.bisect(self._hashes, _hash(key)) % len(self._hashes)
+        return self._nodes[index]
+
+
+class Collection:
+    """
+    A key/value collection partitioned over several backing threads.
+
+    Keys are assigned to shard threads with consistent hashing, so each read
+    or write touches a single shard and resharding only moves about 1/N of
+    the keys. A small manifest thread (named `vdb:<name>`) records the shard
+    thread ids. Deleted keys are stored as null tombstones and hidden on read.
+
+    The threads API has no per-key read: a `get()` downloads the whole state
+    of one shard, so its cost grows with collection size / number of shards
+    (enable the state cache to serve repeated reads locally). Writes only send
+    the written keys. Tombstones stay until `compact()` rewrites the shard.
+
+    Usage:
+        users = client.db.collection(project_id, "users", shards=16, assistant_id=asst_id)
+        users.put("u1", {"name": "Ada"})
+        users.get_many(["u1", "u2"])
+        for key, value in users.scan():
+            ...
+    """
+    def __init__(self, db, project_id, name, manifest_thread_id, manifest, max_workers=8):
+        self.db = db
+        self.project_id = project_id
+        self.name = name
+        self.manifest_thread_id = manifest_thread_id
+        self.max_workers = max_workers
+        self._load(manifest)
+
+    @classmethod
+    def open(cls, db, project_id, name, shards=None, assistant_id=None, manifest_thread_id=None,
+             vnodes=64, max_workers=8):
+        """Open a collection, creating its manifest and shard threads if it does not exist."""
+        threads = db.client.threads
+        if manifest_thread_id is None:
+            thread_name = f"vdb:{name}"
+            for t in threads.list(project_id) or []:
+                if t.get("name") == thread_name:
+                    manifest_thread_id = t["thread_id"]
+                    break
+
+        if manifest_thread_id is not None:
+            manifest = db.get(project_id, manifest_thread_id, MANIFEST_KEY)
+            if manifest:
+                return cls(db, project_id, name, manifest_thread_id, manifest, max_workers=max_workers)
+
+        if not assistant_id:
+            raise ValueError(f"Collection '{name}' does not exist; assistant_id is required to create it")
+        shards = shards or 8
+        if manifest_thread_id is None:
+            manifest_thread_id = threads.create(project_id, f"vdb:{name}", assistant_id,
+                                                metadata={"type": "vdb_manifest"})["thread_id"]
+        manifest = {
+            "name": name,
+            "assistant_id": assistant_id,
+            "vnodes": vnodes,
+            "shards": cls._create_shards(db, project_id, name, assistant_id, range(shards)),
+            "migrating_from": None,
+        }
+        db.update(project_id, manifest_thread_id, {MANIFEST_KEY: manifest})
+        return cls(db, project_id, name, manifest_thread_id, manifest, max_workers=max_workers)
+
+    # --- Reads ---
+
+    def get(self, key, default=None):
+        """Read a single record (one shard fetch)."""
+        # A tombstone (None) at the new owner must not fall back to the old copy.
+        value = self.db._lookup(self.project_id, self._owner(key), key, _MISSING)
+        if value is _MISSING and self._previous is not None:
+            value = self.db._lookup(self.project_id, self._previous_owner(key), key, _MISSING)
+        return default if value is _MISSING or value is None else value
+
+    def get_many(self, keys):
+        """Read several records, fetching each involved shard once and in parallel."""
+        found = self._gather(keys, self._owner)
+        if self._previous is not None:
+            missing = [k for k in keys if k not in found]
+            found.update(self._gather(missing, self._previous_owner))
+        return {k: v for k, v in found.items() if v is not None}
+
+    def scan(self):
+        """Yield every (key, value) record, reading all shards in parallel (each shard once)."""
+        shard_ids = list(self.shards.values())
+        if self._previous is not None:
+            shard_ids += [t for t in self._previous.values() if t not in shard_ids]
+        fetched = dict(zip(shard_ids, self._map(self._values, shard_ids)))
+        seen = set()
+        for thread_id, values in fetched.items():
+            for key, value in values.items():
+                if value is None or key in seen:
+                    continue
+                owner = self._owner(key)
+                if owner != thread_id and key in fetched[owner]:
+                    continue  # not migrated yet: the new owner's copy (or tombstone) wins
+                seen.add(key)
+                yield key, value
+
+    def keys(self):
+        for key, _ in self.scan():
+            yield key
+
+    # --- Writes ---
+
+    def put(self, key, value):
+        """Write a single record to its shard."""
+        self.db.set(self.project_id, self._owner(key), key, value)
+
+    def put_many(self, records):
+        """Write several records with one state update per shard, in parallel."""
+        by_shard = {}
+        for key, value in records.items():
+            by_shard.setdefault(self._owner(key), {})[key] = value
+        list(self._map(lambda item: self.db.update(self.project_id, item[0], item[1]), by_shard.items()))
+
+    def delete(self, key):
+        """Delete a record (stored as a null tombstone)."""
+        self.put(key, None)
+
+    # --- Resharding ---
+
+    def reshard(self, shards):
+        """
+        Change the number of shards while the collection stays readable.
+
+        New shard threads are created and the manifest switches to the new
+        ring immediately (readers fall back to the previous owner while keys
+        move). Only keys whose owner changed are copied, then tombstoned at
+        their old location.
+
+        Costs: one new thread per added shard (growing 4 -> 6 creates 2).
+        Shrinking leaves the removed shards' threads in place, and the
+        tombstones of moved keys stay in the old shards; `compact()` reclaims
+        them at the price of one new thread per rewritten shard.
+        """
+        old_shards = dict(self.shards)
+        names = [f"s{i}" for i in range(shards)]
+        missing = [i for i in range(shards) if f"s{i}" not in old_shards]
+        new_shards = {name: old_shards[name] for name in names if name in old_shards}
+        new_shards.update(self._create_shards(self.db, self.project_id, self.name,
+                                              self.manifest["assistant_id"], missing))
+        return self._migrate(old_shards, new_shards)
+
+    def compact(self, min_ratio=0.25):
+        """
+        Drop tombstones. Thread state cannot remove keys, so each shard where
+        tombstones make up at least `min_ratio` of the keys is rewritten into a
+        new thread holding only live records, online, like `reshard()`.
+
+        Each rewritten shard costs one new thread. The replaced threads are
+        listed under "retired" in the manifest and stay until `purge_retired()`
+        deletes them.
+
+        Returns:
+            Number of tombstones dropped.
+        """
+        ids = list(self.shards.values())
+        fetched = dict(zip(ids, self._map(self._values, ids)))
+        stale, dropped = [], 0
+        for name, thread_id in self.shards.items():
+            values = fetched[thread_id]
+            tombstones = sum(1 for v in values.values() if v is None)
+            if tombstones and tombstones >= min_ratio * len(values):
+                stale.append(name)
+                dropped += tombstones
+        if not stale:
+            return 0
+        old_shards = dict(self.shards)
+        new_shards = dict(old_shards)
+        new_shards.update(self._create_shards(self.db, self.project_id, self.name,
+                                              self.manifest["assistant_id"], [int(n[1:]) for n in stale]))
+        retired = list(self.manifest.get("retired") or []) + [old_shards[n] for n in stale]
+        self._migrate(old_shards, new_shards, fetched=fetched, tombstone=False, retired=retired)
+        self.db.client.metrics.incr("db.collection.tombstones_dropped", dropped)
+        return dropped
+
+    def purge_retired(self):
+        """
+        Delete the threads `compact()` retired; returns their ids. Only call it
+        once every process using the collection has reloaded the manifest
+        (`refresh()`), since an old manifest still points at them.
+        """
+        retired = list(self.manifest.get("retired") or [])
+        for thread_id in retired:
+            self.db.client.threads.delete(self.project_id, thread_id)
+            self.db.invalidate(thread_id)
+        if retired:
+            self._save_manifest(dict(self.manifest, retired=[]))
+        return retired
+
+    def refresh(self):
+        """Reload the manifest (e.g. after another process resharded)."""
+        self.db.invalidate(self.manifest_thread_id)
+        self._load(self.db.get(self.project_id, self.manifest_thread_id, MANIFEST_KEY))
+        return self
+
+    # --- Internals ---
+
+    def _migrate(self, old_shards, new_shards, fetched=None, tombstone=True, retired=None):
+        """
+        Switch to `new_shards` and copy every live key whose owner thread
+        changed; readers fall back to the old owner meanwhile. With
+        `tombstone`, moved keys are nulled at their old location (shards that
+        are being replaced outright are simply abandoned instead).
+        """
+        manifest = dict(self.manifest, shards=new_shards, migrating_from=old_shards)
+        if retired is not None:
+            manifest["retired"] = retired
+        self._save_manifest(manifest)
+
+        old_ids = list(old_shards.values())
+        if fetched is None:
+            fetched = dict(zip(old_ids, self._map(self._values, old_ids)))
+        moved = 0
+        for thread_id in old_ids:
+            outgoing = {}
+            for key, value in fetched[thread_id].items():
+                if value is not None and self._owner(key) != thread_id:
+                    outgoing.setdefault(self._owner(key), {})[key] = value
+            list(self._map(self._copy_missing, outgoing.items()))
+            tombstones = {key: None for batch in outgoing.values() for key in batch}
+            if tombstone and tombstones:
+                self.db.update(self.project_id, thread_id, tombstones)
+            moved += len(tombstones)
+
+        self._save_manifest(dict(self.manifest, migrating_from=None))
+        return moved
+
+    @staticmethod
+    def _create_shards(db, project_id, name, assistant_id, indexes):
+        threads = db.client.threads
+        return {
+            f"s{i}": threads.create(project_id, f"vdb:{name}:s{i}", assistant_id,
+                                    metadata={"type": "vdb_shard", "collection": name})["thread_id"]
+            for i in indexes
+        }
+
+    def _load(self, manifest):
+        self.manifest = manifest
+        self.shards = manifest["shards"]
+        self.ring = HashRing(sorted(self.shards), manifest.get("vnodes", 64))
+        self._previous = manifest.get("migrating_from")
+        self._previous_ring = HashRing(sorted(self._previous), manifest.get("vnodes", 64)) if self._previous else None
+
+    def _save_manifest(self, manifest):
+        self.db.update(self.project_id, self.manifest_thread_id, {MANIFEST_KEY: manifest})
+        self._load(manifest)
+
+    def _owner(self, key):
+        return self.shards[self.ring.node_for(key)]
+
+    def _previous_owner(self, key):
+        return self._previous[self._previous_ring.node_for(key)]
+
+    def _values(self, thread_id):
+        # Tombstones included: they decide which copy wins while keys move.
+        return self.db._raw_values(self.project_id, thread_id)
+
+    def _map(self, fn, items):
+        items = list(items)
+        if len(items) <= 1:
+            return [fn(item) for item in items]
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(items))) as pool:
+            return list(pool.map(fn, items))
+
+    def _copy_missing(self, item):
+        # Keys written (or deleted) at the new owner during the migration win.
+        thread_id, batch = item
+        current = self._values(thread_id)
+        batch = {k: v for k, v in batch.items() if k not in current}
+        if batch:
+            self.db.update(self.project_id, thread_id, batch)
+
+    def _gather(self, keys, owner):
+        by_shard = {}
+        for key in keys:
+            by_shard.setdefault(owner(key), []).append(key)
+        found = {}
+        for (thread_id, shard_keys), values in zip(by_shard.items(), self._map(self._values, list(by_shard))):
+            for key in shard_keys:
+                if key in values:
+                    found[key] = values[key]
+        return found
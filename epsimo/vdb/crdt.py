@@ -0,0 +1,216 @@
+import threading
+import time
+import uuid
+
+from .state import fingerprint
+
+CRDT_PREFIX = "__crdt__/"
+
+def new_writer_id():
+    """A random writer id. Each one adds a slot that stays in the state, so prefer stable ids."""
+    return uuid.uuid4().hex[:12]
+
+
+def slot_key(key, writer_id):
+    return f"{CRDT_PREFIX}{key}/{writer_id}"
+
+
+def parse_slot_key(state_key):
+    """Return (key, writer_id) for a CRDT slot key, or None."""
+    if not isinstance(state_key, str) or not state_key.startswith(CRDT_PREFIX):
+        return None
+    key, _, writer_id = state_key[len(CRDT_PREFIX):].rpartition("/")
+    return (key, writer_id) if key else None
+
+
+# --- Merge functions (pure, applied to every writer's slot) ---
+
+def _merge_gcounter(slots):
+    return sum(slot.get("n", 0) for slot in slots)
+
+
+def _merge_pncounter(slots):
+    return sum(slot.get("p", 0) for slot in slots) - sum(slot.get("n", 0) for slot in slots)
+
+
+def _merge_orset(slots):
+    added, removed, elements = {}, {}, {}
+    for slot in slots:
+        for fp, tags in slot.get("adds", {}).items():
+            added.setdefault(fp, set()).update(tags)
+        for fp, tags in slot.get("removes", {}).items():
+            removed.setdefault(fp, set()).update(tags)
+        elements.update(slot.get("values", {}))
+    return [elements[fp] for fp in sorted(added) if added[fp] - removed.get(fp, set())]
+
+
+def _merge_lwwmap(slots):
+    winners = {}
+    for slot in slots:
+        for field, entry in slot.get("entries", {}).items():
+            if field not in winners or entry[:2] > winners[field][:2]:
+                winners[field] = entry
+    return {field: entry[2] for field, entry in sorted(winners.items()) if not entry[3]}
+
+
+MERGERS = {
+    "gcounter": _merge_gcounter,
+    "pncounter": _merge_pncounter,
+    "orset": _merge_orset,
+    "lwwmap": _merge_lwwmap,
+}
+
+
+def merge_crdts(values):
+    """Replace CRDT slot keys in `values` by the merged value of each CRDT key."""
+    if not isinstance(values, dict) or not any(k.startswith(CRDT_PREFIX) for k in values if isinstance(k, str)):
+        return values
+    groups, merged = {}, {}
+    for state_key, slot in values.items():
+        parsed = parse_slot_key(state_key)
+        if parsed is None:
+            merged[state_key] = slot
+        elif isinstance(slot, dict) and slot.get("type") in MERGERS:
+            groups.setdefault(parsed[0], []).append(slot)
+    for key, slots in groups.items():
+        merged[key] = MERGERS[slots[0]["type"]](slots)
+    return merged
+
+
+def crdt_value(values, key):
+    """Return (found, merged value) for one CRDT key in raw values."""
+    prefix = f"{CRDT_PREFIX}{key}/"
+    slots = [v for k, v in values.items()
+             if isinstance(k, str) and k.startswith(prefix) and "/" not in k[len(prefix):]
+             and isinstance(v, dict) and v.get("type") in MERGERS]
+    if not slots:
+        return False, None
+    return True, MERGERS[slots[0]["type"]](slots)
+
+
+# --- Writer handles ---
+
+class _CRDT:
+    """
+    Base for conflict-free values. Each writer only ever writes its own slot
+    key (`__crdt__/<key>/<writer_id>`), so concurrent writers never overwrite
+    each other and never need read-modify-write retries. Reads merge all slots.
+    Writer ids must be unique per concurrent writer (default: one per client).
+    """
+    type_name = None
+
+    def __init__(self, db, project_id, thread_id, key, writer_id=None):
+        self.db = db
+        self.project_id = project_id
+        self.thread_id = thread_id
+        self.key = key
+        self.writer_id = writer_id or new_writer_id()
+        self._slot = None
+        self._lock = threading.Lock()
+
+    @property
+    def slot_key(self):
+        return slot_key(self.key, self.writer_id)
+
+    def value(self):
+        """Merged value across all writers."""
+        found, value = crdt_value(self._raw_values(), self.key)
+        return value if found else MERGERS[self.type_name]([])
+
+    def reset(self):
+        """Forget the cached slot, so the next write starts from the stored one."""
+        with self._lock:
+            self._slot = None
+
+    def _raw_values(self):
+        values = self.db.get_state(self.project_id, self.thread_id).get("values", {})
+        return self.db.decode_values(values) if isinstance(values, dict) else {}
+
+    def _mutate(self, fn):
+        with self._lock:
+            if self._slot is None:
+                # Only needed once per handle: resume this writer's own slot.
+                existing = self._raw_values().get(self.slot_key)
+                self._slot = existing if isinstance(existing, dict) else {"type": self.type_name}
+            fn(self._slot)
+            self.db.update(self.project_id, self.thread_id, {self.slot_key: self._slot})
+            self.db.client.metrics.incr(f"db.crdt.{self.type_name}.writes")
+
+
+class GCounter(_CRDT):
+    """Grow-only counter."""
+    type_name = "gcounter"
+
+    def increment(self, amount=1):
+        if amount < 0:
+            raise ValueError("GCounter can only grow; use a PNCounter")
+        self._mutate(lambda slot: slot.__setitem__("n", slot.get("n", 0) + amount))
+
+
+class PNCounter(_CRDT):
+    """Counter supporting increments and decrements."""
+    type_name = "pncounter"
+
+    def increment(self, amount=1):
+        field = "p" if amount >= 0 else "n"
+        self._mutate(lambda slot: slot.__setitem__(field, slot.get(field, 0) + abs(amount)))
+
+    def decrement(self, amount=1):
+        self.increment(-amount)
+
+
+class ORSet(_CRDT):
+    """Observed-remove set: a remove only cancels the adds it has seen."""
+    type_name = "orset"
+
+    def add(self, element):
+        fp = fingerprint(element)
+
+        def apply(slot):
+            seq = slot.get("seq", 0) + 1
+            slot["seq"] = seq
+            slot.setdefault("adds", {}).setdefault(fp, []).append(f"{self.writer_id}:{seq}")
+            slot.setdefault("values", {})[fp] = element
+        self._mutate(apply)
+
+    def remove(self, element):
+        fp = fingerprint(element)
+        observed = set()
+        for state_key, slot in self._raw_values().items():
+            parsed = parse_slot_key(state_key)
+            if parsed and parsed[0] == self.key and isinstance(slot, dict):
+                observed.update(slot.get("adds", {}).get(fp, []))
+
+        def apply(slot):
+            removes = slot.setdefault("removes", {})
+            removes[fp] = sorted(set(removes.get(fp, [])) | observed | set(slot.get("adds", {}).get(fp, [])))
+        self._mutate(apply)
+
+    def items(self):
+        return self.value()
+
+    def __contains__(self, element):
+        fp = fingerprint(element)
+        return any(fingerprint(e) == fp for e in self.value())
+
+
+class LWWMap(_CRDT):
+    """Map whose fields resolve concurrent writes by last timestamp (writer id breaks ties)."""
+    type_name = "lwwmap"
+
+    def set(self, field, value):
+        entry = [time.time(), self.writer_id, value, False]
+        self._mutate(lambda slot: slot.setdefault("entries", {}).__setitem__(field, entry))
+
+    def delete(self, field):
+        entry = [time.time(), self.writer_id, None, True]
+        self._mutate(lambda slot: slot.setdefault("entries", {}).__setitem__(field, entry))
+
+    def get(self, field, default=None):
+        return self.value().get(field, default)
+
+    def items(self):
+        return self.value()
+
+
+CRDT_TYPES = {cls.type_name: cls for cls in (GCounter, PNCounter, ORSet, LWWMap)}
@@ -0,0 +1,148 @@
+import copy
+import json
+import os
+import threading
+import time
+
+from .state import diff_values
+
+DEFAULT_HISTORY_DIR = os.path.join(".epsimo", "history")
+
+
+class HistoryLog:
+    """
+    Local append-only history of thread values.
+
+    Each thread has a JSONL log of structural deltas between successive
+    observed states ({"t", "type": "delta", "set": {...}, "removed": [...]}),
+    with a full checkpoint every `checkpoint_every` deltas. A small `.idx`
+    file records the offset of every checkpoint, so reconstructing the state
+    at a timestamp reads one checkpoint and the deltas after it. Storage grows
+    with the size of the changes, not with the number of observations.
+    """
+    def __init__(self, path=None, checkpoint_every=100):
+        self.path = path or DEFAULT_HISTORY_DIR
+        self.checkpoint_every = checkpoint_every
+        self._lock = threading.Lock()
+        self._heads = {}
+        os.makedirs(self.path, exist_ok=True)
+
+    def record(self, thread_id, values, timestamp=None):
+        """
+        Record an observed state of a thread.
+
+        Returns:
+            The entry appended to the log, or None when nothing changed.
+        """
+        timestamp = time.time() if timestamp is None else timestamp
+        values = values if isinstance(values, dict) else {}
+        with self._lock:
+            head, deltas = self._head(thread_id)
+            if head is None or deltas >= self.checkpoint_every:
+                entry = {"t": timestamp, "type": "checkpoint", "values": values}
+                if head is not None and not diff_values(head, values) and set(head) == set(values):
+                    return None
+                deltas = 0
+            else:
+                changes = diff_values(head, values)
+                removed = [k for k in head if k not in values]
+                if not changes and not removed:
+                    return None
+                entry = {"t": timestamp, "type": "delta", "set": changes, "removed": removed}
+                deltas += 1
+            self._append(thread_id, entry)
+            self._heads[thread_id] = (copy.deepcopy(values), deltas)
+            return entry
+
+    def state_at(self, thread_id, timestamp=None):
+        """Reconstruct the values of a thread as of `timestamp` (latest when None)."""
+        log_path = self._log_path(thread_id)
+        if not os.path.exists(log_path):
+            return None
+        offset = 0
+        for t, checkpoint_offset in self._checkpoints(thread_id):
+            if timestamp is not None and t > timestamp:
+                break
+            offset = checkpoint_offset
+
+        values = None
+        with open(log_path, "r", encoding="utf-8") as f:
+            f.seek(offset)
+            for entry in _read_entries(f):
+                if timestamp is not None and entry["t"] > timestamp:
+                    break
+                values = _apply(values, entry)
+        return values
+
+    def entries(self, thread_id, since=None, until=None):
+        """Yield the log entries of a thread between two timestamps."""
+        log_path = self._log_path(thread_id)
+        if not os.path.exists(log_path):
+            return
+        with open(log_path, "r", encoding="utf-8") as f:
+            for entry in _read_entries(f):
+                if since is not None and entry["t"] < since:
+                    continue
+                if until is not None and entry["t"] > until:
+                    break
+                yield entry
+
+    def size(self, thread_id):
+        """Bytes used by a thread's log."""
+        log_path = self._log_path(thread_id)
+        return os.path.getsize(log_path) if os.path.exists(log_path) else 0
+
+    # --- Internals ---
+
+    def _log_path(self, thread_id):
+        return os.path.join(self.path, f"{thread_id}.jsonl")
+
+    def _index_path(self, thread_id):
+        return os.path.join(self.path, f"{thread_id}.idx")
+
+    def _checkpoints(self, thread_id):
+        index_path = self._index_path(thread_id)
+        if not os.path.exists(index_path):
+            return []
+        with open(index_path, "r") as f:
+            return [tuple(json.loads(line)) for line in f if line.strip()]
+
+    def _head(self, thread_id):
+        if thread_id not in self._heads:
+            checkpoints = self._checkpoints(thread_id)
+            values = self.state_at(thread_id)
+            deltas = 0
+            if values is not None and checkpoints:
+                with open(self._log_path(thread_id), "r", encoding="utf-8") as f:
+                    f.seek(checkpoints[-1][1])
+                    deltas = sum(1 for entry in _read_entries(f) if entry["type"] == "delta")
+            self._heads[thread_id] = (values, deltas)
+        return self._heads[thread_id]
+
+    def _append(self, thread_id, entry):
+        line = json.dumps(entry, separators=(",", ":"), default=str) + "\n"
+        with open(self._log_path(thread_id), "a", encoding="utf-8") as f:
+            offset = f.tell()
+            f.write(line)
+        if entry["type"] == "checkpoint":
+            with open(self._index_path(thread_id), "a") as f:
+                f.write(json.dumps([entry["t"], offset]) + "\n")
+
+
+def _read_entries(f):
+    for line in f:
+        try:
+            yield json.loads(line)
+        except ValueError:
+            continue  # torn line from an interrupted write
+
+
+def _apply(values, entry):
+    # Entries are freshly parsed, so values can be updated in place.
+    if entry["type"] == "checkpoint":
+        return entry["values"]
+    values = values if values is not None else {}
+    values.update(entry["set"])
+    for key in entry["removed"]:
+        values.pop(key, None)
+    return values
@@ -0,0 +1,243 @@
+import json
+import os
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from .codec import is_chunk_key
+from .crdt import merge_crdts, parse_slot_key
+from .state import fingerprint
+from .ttl import EXPIRES_PREFIX, is_expiry_key, live_entries, visible
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS threads (thread_id TEXT PRIMARY KEY, updated_at TEXT, indexed_at REAL);
+CREATE TABLE IF NOT EXISTS entries (
+    path TEXT NOT NULL,
+    thread_id TEXT NOT NULL,
+    value_json TEXT NOT NULL,
+    value_num REAL,
+    value_text TEXT
+);
+CREATE INDEX IF NOT EXISTS entries_json ON entries (path, value_json);
+CREATE INDEX IF NOT EXISTS entries_num ON entries (path, value_num);
+CREATE INDEX IF NOT EXISTS entries_text ON entries (path, value_text);
+CREATE INDEX IF NOT EXISTS entries_thread ON entries (thread_id);
+CREATE TABLE IF NOT EXISTS expiring (thread_id TEXT NOT NULL, key TEXT NOT NULL, expires_at REAL NOT NULL);
+CREATE INDEX IF NOT EXISTS expiring_thread ON expiring (thread_id);
+"""
+
+_RANGE_OPS = {"gt": ">", "gte": ">=", "lt": "<", "lte": "<="}
+
+
+def extract(values, path):
+    """
+    Resolve a dotted key path ("profile.country", "items.0.sku") in a values dict.
+    Returns a list of matches: lists found at the end of the path are expanded,
+    so every element is indexed (e.g. tags). Missing paths yield no matches.
+    """
+    current = values
+    for part in path.split("."):
+        if isinstance(current, dict):
+            if part not in current:
+                return []
+            current = current[part]
+        elif isinstance(current, list) and part.isdigit() and int(part) < len(current):
+            current = current[int(part)]
+        else:
+            return []
+    if isinstance(current, list):
+        return current
+    return [current]
+
+
+def default_index_path(project_id):
+    return os.path.join(".epsimo", "index", f"{project_id}.sqlite")
+
+
+class StateIndex:
+    """
+    Local SQLite secondary index over selected key paths of every thread in a project.
+
+    `refresh()` lists the project's threads and only re-reads the states of
+    threads whose `updated_at` changed, fetching them in parallel. `find()`
+    then answers equality, range and prefix queries locally. Values are
+    indexed as `get_all()` returns them (decoded, CRDTs merged); keys with a
+    TTL stop matching when they expire and their thread is re-read on the
+    next refresh.
+
+    Usage:
+        index = client.db.index(project_id, paths=["status", "score", "profile.email"])
+        index.refresh()
+        index.find({"status": "active", "score": {"gte": 10}})
+    """
+    def __init__(self, db, project_id, paths=None, path=None, max_workers=8):
+        self.db = db
+        self.project_id = project_id
+        self.max_workers = max_workers
+        self.path = path or default_index_path(project_id)
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._conn = sqlite3.connect(self.path)
+        self._conn.executescript(_SCHEMA)
+
+        row = self._conn.execute("SELECT value FROM meta WHERE key = 'paths'").fetchone()
+        stored = json.loads(row[0]) if row else []
+        if paths is not None and sorted(paths) != sorted(stored):
+            # The indexed paths changed: every thread has to be re-read.
+            with self._conn:
+                self._conn.execute("DELETE FROM entries")
+                self._conn.execute("DELETE FROM threads")
+                self._conn.execute("DELETE FROM expiring")
+                self._conn.execute("INSERT OR REPLACE INTO meta VALUES ('paths', ?)", (json.dumps(sorted(paths)),))
+            stored = sorted(paths)
+        self.paths = stored
+
+    def refresh(self, full=False):
+        """
+        Bring the index up to date with the project's threads.
+
+        Args:
+            full: Re-read every thread instead of only the changed ones.
+
+        Returns:
+            Dict with counts of scanned, updated and removed threads.
+        """
+        if not self.paths:
+            raise ValueError("No key paths configured for this index")
+        threads = self.db.client.threads.list(self.project_id) or []
+        known = dict(self._conn.execute("SELECT thread_id, updated_at FROM threads"))
+
+        listed = {t["thread_id"]: t.get("updated_at") for t in threads}
+        # Expiry does not change `updated_at`: re-read threads whose indexed keys expired.
+        expired = {row[0] for row in self._conn.execute(
+            "SELECT DISTINCT thread_id FROM expiring WHERE expires_at <= ?", (time.time(),))}
+        stale = [
+            tid for tid, updated_at in listed.items()
+            if full or updated_at is None or known.get(tid) != updated_at or tid not in known or tid in expired
+        ]
+        removed = [tid for tid in known if tid not in listed]
+
+        with self._conn:
+            for tid in removed:
+                self._forget(tid)
+
+        if stale:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+                futures = {pool.submit(self._fetch, tid): tid for tid in stale}
+                batch = []
+                for future in as_completed(futures):
+                    batch.append((futures[future], future.result()))
+                    if len(batch) >= 100:
+                        self._store(batch, listed)
+                        batch = []
+                self._store(batch, listed)
+
+        metrics = self.db.client.metrics
+        metrics.incr("db.index.threads_scanned", len(listed))
+        metrics.incr("db.index.threads_updated", len(stale))
+        return {"scanned": len(listed), "updated": len(stale), "removed": len(removed)}
+
+    def find(self, where):
+        """
+        Return the ids of threads matching every condition in `where`.
+
+        Each condition maps a key path to either a value (equality) or a dict
+        of operators: `eq`, `gt`, `gte`, `lt`, `lte`, `prefix`.
+        """
+        result = None
+        for path, condition in where.items():
+            if path not in self.paths:
+                raise ValueError(f"Path '{path}' is not indexed (indexed: {', '.join(self.paths)})")
+            if not isinstance(condition, dict):
+                condition = {"eq": condition}
+            matches = self._match(path, condition)
+            result = matches if result is None else result & matches
+            if not result:
+                break
+        return sorted(result or [])
+
+    def values(self, thread_id):
+        """Return the indexed values of one thread as {path: [values]}."""
+        rows = self._conn.execute(
+            "SELECT path, value_json FROM entries WHERE thread_id = ? ORDER BY rowid", (thread_id,)
+        )
+        found = {}
+        for path, value_json in rows:
+            found.setdefault(path, []).append(json.loads(value_json))
+        return found
+
+    def close(self):
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    # --- Internals ---
+
+    def _fetch(self, thread_id):
+        """The thread's values as `get_all()` sees them, and {key: expires_at} of its indexed keys."""
+        state = self.db.client.threads.get_state(self.project_id, thread_id) or {}
+        values = state.get("values")
+        if not isinstance(values, dict):
+            return {}, {}
+        # Only decode what the indexed paths (their CRDT slots and expiry entries) need.
+        roots = {path.split(".")[0] for path in self.paths}
+        values = self.db.decode_values({
+            k: v for k, v in values.items()
+            if k in roots or is_chunk_key(k) or is_expiry_key(k) or (parse_slot_key(k) or ("",))[0] in roots
+        })
+        view = merge_crdts(visible(values))
+        deadlines = {k[len(EXPIRES_PREFIX):]: entry[0] for k, entry in live_entries(values, roots & set(view)).items()}
+        return view, deadlines
+
+    def _forget(self, thread_id):
+        self._conn.execute("DELETE FROM entries WHERE thread_id = ?", (thread_id,))
+        self._conn.execute("DELETE FROM threads WHERE thread_id = ?", (thread_id,))
+        self._conn.execute("DELETE FROM expiring WHERE thread_id = ?", (thread_id,))
+
+    def _store(self, batch, listed):
+        if not batch:
+            return
+        now = time.time()
+        with self._conn:
+            for thread_id, (values, deadlines) in batch:
+                self._forget(thread_id)
+                self._conn.executemany("INSERT INTO expiring VALUES (?, ?, ?)",
+                                       [(thread_id, key, at) for key, at in deadlines.items()])
+                rows = []
+                for path in self.paths:
+                    for value in extract(values, path):
+                        if value is None:
+                            continue
+                        number = value if isinstance(value, (int, float)) and not isinstance(value, bool) else None
+                        text = value if isinstance(value, str) else None
+                        rows.append((path, thread_id, fingerprint(value), number, text))
+                self._conn.executemany("INSERT INTO entries VALUES (?, ?, ?, ?, ?)", rows)
+                self._conn.execute("INSERT INTO threads VALUES (?, ?, ?)", (thread_id, listed.get(thread_id), now))
+
+    def _match(self, path, condition):
+        clauses, params = ["path = ?"], [path]
+        for op, operand in condition.items():
+            if op == "eq":
+                clauses.append("value_json = ?")
+                params.append(fingerprint(operand))
+            elif op in _RANGE_OPS:
+                column = "value_text" if isinstance(operand, str) else "value_num"
+                clauses.append(f"{column} {_RANGE_OPS[op]} ?")
+                params.append(operand)
+            elif op == "prefix":
+                # Range scan on the text index instead of LIKE.
+                clauses.append("value_text >= ? AND value_text < ?")
+                params += [operand, operand + "\U0010ffff"]
+            else:
+                raise ValueError(f"Unsupported operator '{op}'")
+        # Keys past their TTL no longer match, even before the next refresh.
+        clauses.append("thread_id NOT IN (SELECT thread_id FROM expiring WHERE key = ? AND expires_at <= ?)")
+        params += [path.split(".")[0], time.time()]
+        sql = f"SELECT DISTINCT thread_id FROM entries WHERE {' AND '.join(clauses)}"
+        return {row[0] for row in self._conn.execute(sql, params)}
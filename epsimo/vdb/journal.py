@@ -0,0 +1,229 @@
+import json
+import os
+import time
+import uuid
+
+import requests
+
+from .state import fingerprint
+
+DEFAULT_JOURNAL_DIR = os.path.join(".epsimo", "journal")
+
+# Answers meaning the write was refused for good. Anything else (401, 403,
+# 408, 429, 5xx, network errors) may succeed later, so the entry is kept.
+REJECTED_STATUSES = (400, 404, 409, 410, 422)
+
+
+def _process_alive(pid):
+    if os.name == "nt":
+        return None  # no cheap, safe liveness check; rely on age
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _rejected(error):
+    """True when the server refused the write for good, so it was never applied and never will be."""
+    response = getattr(error, "response", None)
+    return response is not None and response.status_code in REJECTED_STATUSES
+
+
+class Journal:
+    """
+    Local write-ahead journal for Virtual DB batches.
+
+    A batch is written to its own file (and fsynced) before it is sent, and
+    the file is removed once the server accepted it. Entries left behind by a
+    crashed process are replayed by `replay()`. Batch values are absolute
+    top-level keys, so sending an entry twice has the same effect as once.
+    When the state cache holds the thread, an entry also records the values
+    it replaced, so a replay can tell whether another writer changed them since.
+    """
+    def __init__(self, path=None, stale_after=300.0):
+        # Resolved once, so a later chdir() does not switch journals.
+        self.path = os.path.abspath(path or DEFAULT_JOURNAL_DIR)
+        self.stale_after = stale_after
+        self.conflicts = []  # entries dropped by replay() because their keys changed meanwhile
+        os.makedirs(self.path, exist_ok=True)
+
+    def append(self, project_id, thread_id, values, base=None):
+        """
+        Durably record a batch; returns its entry id.
+        `base` maps each key to the fingerprint of the value it replaces (None when unknown).
+        """
+        entry_id = f"{time.time_ns():020d}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        entry = {"id": entry_id, "pid": os.getpid(), "t": time.time(),
+                 "project_id": project_id, "thread_id": thread_id, "values": values, "base": base}
+        final = os.path.join(self.path, f"{entry_id}.json")
+        tmp = final + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(entry, f, separators=(",", ":"))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, final)
+        return entry_id
+
+    def commit(self, entry_id):
+        """Forget a batch the server accepted."""
+        try:
+            os.remove(os.path.join(self.path, f"{entry_id}.json"))
+        except FileNotFoundError:
+            pass
+
+    def pending(self):
+        """Yield entries left uncommitted by processes that are gone, oldest first."""
+        now = time.time()
+        for name in sorted(os.listdir(self.path)):
+            if not name.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(self.path, name), "r", encoding="utf-8") as f:
+                    entry = json.load(f)
+            except (OSError, ValueError):
+                continue  # removed meanwhile, or never completed (tmp files are not renamed)
+            if entry["pid"] == os.getpid():
+                continue  # still in flight in this process
+            alive = _process_alive(entry["pid"])
+            if alive or (alive is None and now - entry["t"] < self.stale_after):
+                continue
+            yield entry
+
+    def replay(self, db):
+        """
+        Send every orphaned batch again, whole or not at all; returns the number replayed.
+
+        A batch whose keys all hold its values already went through before
+        the crash. A batch with a key holding neither its value nor the value
+        it replaced conflicts with a later write: it is dropped, kept aside as
+        `<id>.conflict` in the journal directory and listed in `conflicts`.
+        Batches recorded without the replaced values are sent again as they are.
+        """
+        replayed = 0
+        for entry in self.pending():
+            outcome = self._classify(db, entry)
+            if outcome == "conflict":
+                self.conflicts.append(entry)
+                db.client.metrics.incr("db.batch.replay_conflicts")
+                self._set_aside(entry["id"])
+                continue
+            if outcome == "apply":
+                try:
+                    db.update(entry["project_id"], entry["thread_id"], entry["values"])
+                except requests.HTTPError as e:
+                    if not _rejected(e):
+                        raise
+                    db.client.metrics.incr("db.batch.replay_rejected")
+                else:
+                    replayed += 1
+            self.commit(entry["id"])
+        if replayed:
+            db.client.metrics.incr("db.batch.replayed", replayed)
+        return replayed
+
+    @staticmethod
+    def _classify(db, entry):
+        """"applied", "apply" or "conflict", from the thread's current values."""
+        db.invalidate(entry["thread_id"])  # judge on the server's values, not a cached copy
+        current = db._raw_values(entry["project_id"], entry["thread_id"])
+        now = {key: fingerprint(current.get(key)) for key in entry["values"]}
+        if all(now[key] == fingerprint(value) for key, value in entry["values"].items()):
+            return "applied"
+        base = entry.get("base")
+        if base is None:
+            return "apply"  # unknown base: the batch is sent as it is
+        for key, value in entry["values"].items():
+            if now[key] != base.get(key) and now[key] != fingerprint(value):
+                return "conflict"
+        return "apply"
+
+    def _set_aside(self, entry_id):
+        try:
+            os.replace(os.path.join(self.path, f"{entry_id}.json"), os.path.join(self.path, f"{entry_id}.conflict"))
+        except FileNotFoundError:
+            pass
+
+
+class Batch:
+    """
+    Multi-key write applied atomically in one state update.
+
+    Changes are staged in memory and sent as a single payload on `commit()`
+    (or when the `with` block exits without an exception), after being
+    recorded in the journal so a crash mid-commit is replayed on restart.
+    """
+    def __init__(self, db, project_id, thread_id, journal):
+        self.db = db
+        self.project_id = project_id
+        self.thread_id = thread_id
+        self.journal = journal
+        self.values = {}
+        self.committed = False
+
+    def set(self, key, value):
+        self.values[key] = value
+        return self
+
+    def update(self, data):
+        self.values.update(data)
+        return self
+
+    def delete(self, key):
+        self.values[key] = None
+        return self
+
+    def get(self, key, default=None):
+        if key in self.values:
+            return self.values[key]
+        return self.db.get(self.project_id, self.thread_id, key, default)
+
+    def commit(self):
+        if self.committed:
+            raise RuntimeError("Batch already committed")
+        self.committed = True
+        if not self.values:
+            return
+        entry_id = self.journal.append(self.project_id, self.thread_id, self.values, base=self._base())
+        try:
+            self.db.update(self.project_id, self.thread_id, self.values)
+        except requests.HTTPError as e:
+            if _rejected(e):
+                self.journal.commit(entry_id)  # nothing to replay
+            raise
+        self.journal.commit(entry_id)
+        metrics = self.db.client.metrics
+        metrics.incr("db.batch.commits")
+        metrics.incr("db.batch.keys", len(self.values))
+
+    def _base(self):
+        """
+        Fingerprints of the values the batch replaces, taken from the state
+        cache so the commit stays one round trip; None when it is not cached.
+        """
+        cache = self.db.cache
+        entry = cache.lookup(self.thread_id) if cache is not None else None
+        raw = entry.state.get("values") if entry is not None else None
+        if not isinstance(raw, dict):
+            return None
+        reader = self.db._reader
+        try:
+            return {key: fingerprint(reader.decode(key, raw.get(key), raw)) for key in self.values}
+        except ValueError:
+            return None  # chunks not in the cached copy
+
+    def discard(self):
+        self.values = {}
+        self.committed = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None and not self.committed:
+            self.commit()
+        elif not self.committed:
+            self.discard()
+        return False
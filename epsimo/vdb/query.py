@@ -0,0 +1,64 @@
+import functools
+import re
+
+_TOKEN = re.compile(r"""
+    \[(?P<quote>["'])(?P<key>.*?)(?P=quote)\]   # ["key.with.dots"]
+  | \[(?P<index>-?\d+|\*)\]                     # [0], [-1], [*]
+  | (?P<dot>\.)?(?P<name>[^.\[\]]+)             # name, .name, .*
+""", re.X)
+
+_WILDCARD = ("*",)
+
+
+@functools.lru_cache(maxsize=256)
+def compile_path(expr):
+    """
+    Compile a path expression such as `a.b[*].c`, `items[0]`, `users.*.name`
+    or `["key.with.dots"]` into a tuple of steps. Compiled paths are cached.
+    """
+    steps, pos = [], 0
+    while pos < len(expr):
+        match = _TOKEN.match(expr, pos)
+        if match is None or (match.group("name") is not None and not match.group("dot") and pos > 0):
+            raise ValueError(f"Invalid path '{expr}' at position {pos}")
+        if match.group("quote"):
+            steps.append(("key", match.group("key")))
+        elif match.group("index") is not None:
+            index = match.group("index")
+            steps.append(_WILDCARD if index == "*" else ("index", int(index)))
+        else:
+            name = match.group("name")
+            steps.append(_WILDCARD if name == "*" else ("key", name))
+        pos = match.end()
+    return tuple(steps)
+
+
+def select(value, path):
+    """
+    Yield every value matching `path` (an expression or compiled steps).
+    Missing keys and out-of-range indexes simply produce no match.
+    """
+    steps = compile_path(path) if isinstance(path, str) else path
+    return _select(value, steps, 0)
+
+
+def _select(value, steps, i):
+    if i == len(steps):
+        yield value
+        return
+    step = steps[i]
+    if step == _WILDCARD:
+        children = value.values() if isinstance(value, dict) else value if isinstance(value, list) else ()
+        for child in children:
+            yield from _select(child, steps, i + 1)
+    elif step[0] == "key":
+        if isinstance(value, dict) and step[1] in value:
+            yield from _select(value[step[1]], steps, i + 1)
+    elif isinstance(value, list) and -len(value) <= step[1] < len(value):
+        yield from _select(value[step[1]], steps, i + 1)
+
+
+def root_key(path):
+    """Top-level key a path starts with, or None when it starts with a wildcard."""
+    steps = compile_path(path) if isinstance(path, str) else path
+    return steps[0][1] if steps and steps[0][0] == "key" else None
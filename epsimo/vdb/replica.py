@@ -0,0 +1,168 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .crdt import crdt_value, merge_crdts
+from .ttl import expiry_entry, is_expired, is_expiry_key, visible
+
+
+class _Snapshot:
+    __slots__ = ("values", "etag", "refreshed_at")
+
+    def __init__(self, values, etag):
+        self.values = values
+        self.etag = etag
+        self.refreshed_at = time.monotonic()
+
+
+class ReadReplica:
+    """
+    In-memory replica of a few hot threads.
+
+    Reads are served from memory with no network calls as long as the copy of
+    the thread was refreshed less than `max_staleness` seconds ago; otherwise
+    the read falls back to the server (and refreshes the copy). A background
+    thread revalidates every `refresh_interval` seconds with ETags, so an
+    unchanged thread costs an empty 304. Values streamed by runs of the same
+    client and writes made through `client.db` are applied immediately.
+
+    Metrics: `db.replica.reads`, `db.replica.fallbacks`, `db.replica.refreshes`
+    and the `db.replica.lag` gauge (seconds since the oldest refresh).
+    """
+    def __init__(self, db, project_id, thread_ids, refresh_interval=5.0, max_staleness=30.0, concurrency=8):
+        self.db = db
+        self.project_id = project_id
+        self.thread_ids = list(thread_ids)
+        self.refresh_interval = refresh_interval
+        self.max_staleness = max_staleness
+        self.concurrency = concurrency
+        self._snapshots = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Load every thread, then keep refreshing in the background."""
+        self.refresh()
+        self.db.client.threads.subscribe_values(self._on_values)
+        self.db._replicas.append(self)
+        self._thread = threading.Thread(target=self._run, name="epsimo-db-replica", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self.db.client.threads.unsubscribe_values(self._on_values)
+        if self in self.db._replicas:
+            self.db._replicas.remove(self)
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+        return False
+
+    # --- Reads ---
+
+    def get(self, thread_id, key, default=None):
+        """Read one key, from memory when fresh enough."""
+        values = self._values(thread_id)
+        if is_expiry_key(key):
+            return default
+        if values.get(key) is None:
+            found, value = crdt_value(values, key)
+            return value if found else default
+        value = values[key]
+        if value is None or is_expired(key, value, expiry_entry(values, key)):
+            return default
+        return value
+
+    def get_all(self, thread_id):
+        """Read all values of a thread, from memory when fresh enough."""
+        return dict(merge_crdts(visible(self._values(thread_id))))
+
+    def lag(self, thread_id=None):
+        """Seconds since a thread (or the least recently refreshed thread) was refreshed."""
+        with self._lock:
+            snapshots = [self._snapshots.get(thread_id)] if thread_id else list(self._snapshots.values())
+        now = time.monotonic()
+        ages = [now - s.refreshed_at for s in snapshots if s is not None]
+        return max(ages) if ages else None
+
+    # --- Refresh ---
+
+    def refresh(self, thread_ids=None):
+        """Revalidate threads now (in parallel); unchanged threads cost a 304."""
+        thread_ids = list(thread_ids or self.thread_ids)
+        with ThreadPoolExecutor(max_workers=min(self.concurrency, max(1, len(thread_ids)))) as pool:
+            list(pool.map(self._refresh_one, thread_ids))
+        self._report_lag()
+
+    def apply(self, thread_id, values):
+        """Replace a thread's copy with values received from a change feed."""
+        if thread_id in self.thread_ids and isinstance(values, dict):
+            with self._lock:
+                self._snapshots[thread_id] = _Snapshot(self.db.decode_values(values), None)
+
+    def apply_write(self, thread_id, data):
+        """Merge a write made through this client into the copy (read-your-writes)."""
+        with self._lock:
+            snapshot = self._snapshots.get(thread_id)
+            if snapshot is not None:
+                values = dict(snapshot.values)
+                values.update(data)
+                # Keep refreshed_at: the write says nothing about other writers.
+                snapshot.values = self.db.decode_values(values)
+                snapshot.etag = None
+
+    # --- Internals ---
+
+    def _values(self, thread_id):
+        with self._lock:
+            snapshot = self._snapshots.get(thread_id)
+        metrics = self.db.client.metrics
+        if snapshot is not None and time.monotonic() - snapshot.refreshed_at <= self.max_staleness:
+            metrics.incr("db.replica.reads")
+            return snapshot.values
+        metrics.incr("db.replica.fallbacks")
+        self._refresh_one(thread_id)
+        with self._lock:
+            return self._snapshots[thread_id].values
+
+    def _refresh_one(self, thread_id):
+        with self._lock:
+            snapshot = self._snapshots.get(thread_id)
+        state, etag = self.db.client.threads.get_state_if_changed(
+            self.project_id, thread_id, etag=snapshot.etag if snapshot else None
+        )
+        self.db.client.metrics.incr("db.replica.refreshes")
+        with self._lock:
+            if state is None and snapshot is not None:
+                snapshot.refreshed_at = time.monotonic()
+                return
+            values = state.get("values") if isinstance(state, dict) else None
+            self._snapshots[thread_id] = _Snapshot(
+                self.db.decode_values(values if isinstance(values, dict) else {}), etag
+            )
+
+    def _on_values(self, thread_id, values):
+        if values is not None:
+            self.apply(thread_id, values)
+
+    def _report_lag(self):
+        lag = self.lag()
+        if lag is not None:
+            self.db.client.metrics.gauge("db.replica.lag", lag)
+
+    def _run(self):
+        while not self._stop.wait(self.refresh_interval):
+            try:
+                self.refresh()
+            except Exception:
+                # Keep serving the last copy; reads fall back once it is too stale.
+                self.db.client.metrics.incr("db.replica.refresh_errors")
+                self._report_lag()
@@ -0,0 +1,47 @@
+import json
+
+
+def state_version(state):
+    """Best-effort version marker of a thread state (explicit version or checkpoint id)."""
+    if not isinstance(state, dict):
+        return None
+    for key in ("version", "checkpoint_id"):
+        if state.get(key):
+            return state[key]
+    configurable = (state.get("config") or {}).get("configurable") or {}
+    return configurable.get("checkpoint_id") or configurable.get("thread_ts")
+
+
+def state_size(state):
+    """Size in bytes of a state serialized as compact JSON."""
+    return len(json.dumps(state, separators=(",", ":"), default=str))
+
+
+def fingerprint(value):
+    """Canonical JSON encoding of a value, used to compare values structurally."""
+    return json.dumps(value, sort_keys=True, separators=(",", ":"), default=str)
+
+
+def diff_values(old, new, delete_missing=False):
+    """
+    Compute the top-level keys of `new` that differ from `old`.
+
+    Args:
+        old: Last known values (dict or None).
+        new: Desired values.
+        delete_missing: Treat keys present in `old` but absent from `new` as
+            removed and map them to None (thread state cannot drop keys).
+
+    Returns:
+        Dict containing only the changed keys.
+    """
+    old = old if isinstance(old, dict) else {}
+    changes = {}
+    for key, value in new.items():
+        if key not in old or fingerprint(old[key]) != fingerprint(value):
+            changes[key] = value
+    if delete_missing:
+        for key in old:
+            if key not in new and old[key] is not None:
+                changes[key] = None
+    return changes
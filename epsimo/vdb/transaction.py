@@ -0,0 +1,124 @@
+import copy
+import random
+import time
+
+import requests
+
+from .state import diff_values, fingerprint, state_version
+from .ttl import EXPIRES_KEY, expired_keys, expiry_key, visible
+
+
+class ConflictError(Exception):
+    """Raised when a thread's state changed between the read and the write of a transaction."""
+
+
+class Transaction:
+    """
+    Optimistic read-modify-write of a thread's values.
+
+    `run(fn)` reads the state and its version (ETag / checkpoint id), calls
+    `fn(values)` on a private copy and writes back only the keys that changed.
+    Before writing, a conditional GET (If-None-Match, answered with an empty
+    304 when nothing moved) checks that no other writer committed meanwhile;
+    the write itself carries If-Match so servers that support it reject it
+    atomically. On conflict the transaction backs off and re-runs `fn`.
+    """
+    def __init__(self, db, project_id, thread_id, retries=5, backoff=0.05, max_backoff=2.0, raw=False):
+        self.db = db
+        self.raw = raw
+        self.project_id = project_id
+        self.thread_id = thread_id
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+
+    def run(self, fn):
+        """
+        Apply `fn` and commit it, retrying on conflict.
+
+        Args:
+            fn: Callable receiving the current values (a dict it may mutate).
+                It may also return a new dict to use instead. Expired TTL
+                keys and the expiry map are hidden from it unless `raw`.
+
+        Returns:
+            The committed values.
+        """
+        metrics = self.db.client.metrics
+        for attempt in range(self.retries + 1):
+            state, etag = self._read()
+            values = state.get("values") if isinstance(state, dict) else None
+            values = self.db.decode_values(values) if isinstance(values, dict) else {}
+
+            base = values if self.raw else visible(values)
+            working = copy.deepcopy(base)
+            result = fn(working)
+            new_values = result if result is not None else working
+
+            changes = diff_values(base, new_values, delete_missing=True)
+            if changes and not self.raw:
+                self._drop_expiry(values, changes)
+            if not changes:
+                metrics.incr("db.txn.noop")
+                return new_values
+
+            try:
+                self._check(state, etag)
+                try:
+                    self.db.update(self.project_id, self.thread_id, changes, if_match=etag)
+                except requests.HTTPError as e:
+                    if is_conflict(e):
+                        raise ConflictError(f"Thread {self.thread_id} rejected the write") from e
+                    raise
+            except ConflictError:
+                metrics.incr("db.txn.conflicts")
+                self.db.invalidate(self.thread_id)
+                if attempt < self.retries:
+                    delay = min(self.max_backoff, self.backoff * (2 ** attempt))
+                    time.sleep(random.uniform(0, delay))
+                continue
+            metrics.incr("db.txn.commits")
+            return new_values
+
+        raise ConflictError(
+            f"Thread {self.thread_id} kept changing; gave up after {self.retries + 1} attempts"
+        )
+
+    @staticmethod
+    def _drop_expiry(values, changes):
+        """Rewriting an expired key starts it afresh: remove its stale expiry entry."""
+        rewritten = set(expired_keys(values)) & set(changes)
+        for key in rewritten:
+            if values.get(expiry_key(key)) is not None:
+                changes[expiry_key(key)] = None
+        legacy = values.get(EXPIRES_KEY)
+        if isinstance(legacy, dict) and rewritten & set(legacy):
+            remaining = {k: v for k, v in legacy.items() if k not in rewritten}
+            changes[EXPIRES_KEY] = remaining or None
+
+    def _read(self):
+        db = self.db
+        if db.cache is not None:
+            state = db._read_state(self.project_id, self.thread_id)  # fn works on a copy
+            entry = db.cache.lookup(self.thread_id)
+            return state, entry.etag if entry is not None else None
+        return db.client.threads.get_state_if_changed(self.project_id, self.thread_id)
+
+    def _check(self, state, etag):
+        """Raise ConflictError if the thread moved past the state that was read."""
+        current, _ = self.db.client.threads.get_state_if_changed(self.project_id, self.thread_id, etag=etag)
+        if current is None:
+            return
+        version = state_version(state)
+        if version is not None and state_version(current) is not None:
+            changed = version != state_version(current)
+        else:
+            changed = fingerprint(state.get("values")) != fingerprint(current.get("values"))
+        if changed:
+            raise ConflictError(f"Thread {self.thread_id} changed since it was read")
+
+
+def is_conflict(error):
+    """True when an HTTP error means the server rejected a conditional write."""
+    response = getattr(error, "response", None)
+    return isinstance(error, requests.HTTPError) and response is not None and response.status_code in (409, 412)
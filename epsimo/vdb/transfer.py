@@ -0,0 +1,307 @@
+import gzip
+import json
+import os
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet support is optional
+    pa = None
+    pq = None
+
+
+def bounded_map(fn, items, concurrency=8):
+    """
+    Apply `fn` to `items` on a worker pool with at most `2 * concurrency` tasks
+    in flight, yielding results as they complete (unordered). Memory stays
+    constant however many items there are.
+    """
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        pending = set()
+        for item in items:
+            pending.add(pool.submit(fn, item))
+            if len(pending) >= 2 * concurrency:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+
+
+def detect_format(path):
+    if path.endswith(".parquet"):
+        return "parquet"
+    return "jsonl"
+
+
+class _JsonlWriter:
+    """
+    Appends JSONL records, gzip-compressed when the path ends with `.gz`.
+    Each checkpoint closes the current gzip member, so the file is valid up
+    to the last checkpoint offset even if the process dies mid-write.
+    """
+    def __init__(self, path, offset=None):
+        self.compress = path.endswith(".gz")
+        self._raw = open(path, "r+b" if offset is not None else "wb")
+        if offset is not None:
+            self._raw.truncate(offset)
+            self._raw.seek(offset)
+        self._member = None
+
+    def write(self, record):
+        line = (json.dumps(record, separators=(",", ":"), default=str) + "\n").encode("utf-8")
+        if self.compress:
+            if self._member is None:
+                self._member = gzip.GzipFile(fileobj=self._raw, mode="wb")
+            self._member.write(line)
+        else:
+            self._raw.write(line)
+
+    def checkpoint(self):
+        """Make everything written so far durable and return the file offset."""
+        if self._member is not None:
+            self._member.close()
+            self._member = None
+        self._raw.flush()
+        os.fsync(self._raw.fileno())
+        return self._raw.tell()
+
+    def close(self):
+        self.checkpoint()
+        self._raw.close()
+
+
+class _ParquetWriter:
+    """Writes records as Parquet row groups (values stored as JSON text)."""
+    def __init__(self, path):
+        self.schema = pa.schema([
+            ("thread_id", pa.string()),
+            ("name", pa.string()),
+            ("updated_at", pa.string()),
+            ("values", pa.string()),
+        ])
+        self._writer = pq.ParquetWriter(path, self.schema, compression="zstd")
+        self._rows = []
+
+    def write(self, record):
+        self._rows.append(dict(record, values=json.dumps(record["values"], separators=(",", ":"), default=str)))
+
+    def checkpoint(self):
+        if self._rows:
+            self._writer.write_table(pa.Table.from_pylist(self._rows, schema=self.schema))
+            self._rows = []
+        return None
+
+    def close(self):
+        self.checkpoint()
+        self._writer.close()
+
+
+def _read_progress(path):
+    offset, done = None, set()
+    if not os.path.exists(path):
+        return offset, done
+    with open(path, "r") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                break  # torn last line from an interrupted run
+            offset = entry["offset"]
+            done.update(entry["done"])
+    return offset, done
+
+
+def export_project(db, project_id, output, format=None, concurrency=8, resume=False,
+                   checkpoint_every=500, on_progress=None):
+    """
+    Stream the state of every thread in a project to `output`.
+
+    Threads are fetched on a bounded worker pool and written as they arrive,
+    one record per thread: {"thread_id", "name", "updated_at", "values"}.
+    JSONL output (`.jsonl` or `.jsonl.gz`) records a checkpoint in
+    `<output>.progress` every `checkpoint_every` threads; `resume=True`
+    continues an interrupted export from the last checkpoint.
+
+    Returns:
+        Dict with the number of exported and skipped (already exported) threads.
+    """
+    format = format or detect_format(output)
+    progress_path = f"{output}.progress"
+    threads = db.client.threads
+
+    if format == "parquet":
+        if pq is None:
+            raise RuntimeError("Parquet export requires pyarrow (pip install pyarrow)")
+        if resume:
+            raise ValueError("Resume is only supported for JSONL exports")
+        writer = _ParquetWriter(output)
+        done = set()
+    else:
+        offset, done = (None, set())
+        if resume and os.path.exists(output):
+            offset, done = _read_progress(progress_path)
+        elif os.path.exists(progress_path):
+            os.remove(progress_path)
+        writer = _JsonlWriter(output, offset=offset)
+
+    listing = [t for t in threads.list(project_id) or [] if t["thread_id"] not in done]
+
+    def fetch(thread):
+        state = threads.get_state(project_id, thread["thread_id"]) or {}
+        values = state.get("values")
+        return {
+            "thread_id": thread["thread_id"],
+            "name": thread.get("name"),
+            "updated_at": thread.get("updated_at"),
+            "values": values if isinstance(values, dict) else {},
+        }
+
+    exported, batch = 0, []
+    progress = open(progress_path, "a") if format != "parquet" else None
+    try:
+        for record in bounded_map(fetch, listing, concurrency):
+            writer.write(record)
+            batch.append(record["thread_id"])
+            exported += 1
+            if len(batch) >= checkpoint_every:
+                _checkpoint(writer, progress, batch)
+                batch = []
+            if on_progress:
+                on_progress(exported, len(listing))
+        _checkpoint(writer, progress, batch)
+    finally:
+        writer.close()
+        if progress is not None:
+            progress.close()
+
+    db.client.metrics.incr("db.export.threads", exported)
+    return {"exported": exported, "skipped": len(done)}
+
+
+def _checkpoint(writer, progress, batch):
+    offset = writer.checkpoint()
+    if batch and progress is not None:
+        progress.write(json.dumps({"offset": offset, "done": batch}) + "\n")
+        progress.flush()
+
+
+def read_records(path, format=None):
+    """Yield exported records one at a time from a JSONL(.gz) or Parquet file."""
+    format = format or detect_format(path)
+    if format == "parquet":
+        if pq is None:
+            raise RuntimeError("Parquet import requires pyarrow (pip install pyarrow)")
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=256):
+            for row in batch.to_pylist():
+                row["values"] = json.loads(row["values"]) if row["values"] else {}
+                yield row
+        return
+
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8") as f:
+        try:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        except EOFError:
+            # Truncated trailing gzip member from an interrupted export.
+            return
+
+
+def _read_import_progress(path):
+    """{old thread id: {"thread_id": new id, "done": bool}} from an import checkpoint file."""
+    entries = {}
+    if not os.path.exists(path):
+        return entries
+    with open(path, "r") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                break  # torn last line from an interrupted run
+            entries[entry["source"]] = {"thread_id": entry["thread_id"], "done": entry["done"]}
+    return entries
+
+
+def import_project(db, project_id, input, format=None, concurrency=8, assistant_id=None, resume=False,
+                   checkpoint_every=500, on_progress=None):
+    """
+    Write exported thread states back into a project.
+
+    Each record is written with a single state update, as stored (values are
+    not re-encoded, so compressed values and their chunks are copied as is).
+    Without `assistant_id` records go to their original thread ids (restore);
+    with it, new threads are created with the same names (migration to
+    another project). Requests go through the client's rate limiter when one
+    is configured.
+
+    Progress is recorded in `<input>.<project_id>.progress`, fsynced every
+    `checkpoint_every` threads: each created thread as soon as it exists and
+    each thread once written. `resume=True` skips the threads already written
+    and reuses the threads already created, so no thread is created twice.
+    A failing record does not stop the import; its error is reported and a
+    resumed run retries it.
+
+    Returns:
+        Dict with the number of imported and skipped threads, an
+        {old_id: new_id} map and {old_id: error} for failed records.
+    """
+    threads = db.client.threads
+    progress_path = f"{input}.{project_id}.progress"
+    known = _read_import_progress(progress_path) if resume else {}
+    if not resume and os.path.exists(progress_path):
+        os.remove(progress_path)
+    progress = open(progress_path, "a")
+    lock = threading.Lock()
+    unsynced = [0]
+
+    def record_progress(source, thread_id, done):
+        with lock:
+            progress.write(json.dumps({"source": source, "thread_id": thread_id, "done": done}) + "\n")
+            progress.flush()
+            unsynced[0] += 1
+            if unsynced[0] >= checkpoint_every:
+                os.fsync(progress.fileno())
+                unsynced[0] = 0
+
+    def write(record):
+        source = record["thread_id"]
+        thread_id = (known.get(source) or {}).get("thread_id") or source
+        try:
+            if assistant_id and source not in known:
+                created = threads.create(project_id, record.get("name") or source, assistant_id)
+                thread_id = created["thread_id"]
+                record_progress(source, thread_id, False)
+            if record.get("values"):
+                db._write_raw(project_id, thread_id, record["values"])
+            record_progress(source, thread_id, True)
+            return source, thread_id, None
+        except Exception as e:
+            return source, thread_id, str(e)
+
+    pending = (r for r in read_records(input, format) if not (known.get(r["thread_id"]) or {}).get("done"))
+    mapping = {source: entry["thread_id"] for source, entry in known.items() if entry["done"]}
+    failed, imported = {}, 0
+    try:
+        for source, thread_id, error in bounded_map(write, pending, concurrency):
+            if error is not None:
+                failed[source] = error
+                db.client.metrics.incr("db.import.errors")
+                continue
+            mapping[source] = thread_id
+            imported += 1
+            if on_progress:
+                on_progress(imported)
+    finally:
+        with lock:
+            os.fsync(progress.fileno())
+            progress.close()
+
+    db.client.metrics.incr("db.import.threads", imported)
+    skipped = sum(1 for entry in known.values() if entry["done"])
+    return {"imported": imported, "skipped": skipped, "threads": mapping, "failed": failed}
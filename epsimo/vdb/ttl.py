@@ -0,0 +1,164 @@
+import hashlib
+import threading
+import time
+
+from .state import fingerprint
+
+# Each expiring key has its own entry, `__expires__/<key>` = [expires_at, value_hash],
+# so setting a TTL is a single blind write. Older clients kept every entry in one
+# `__expires__` map; it is still honoured and `sweep()` moves its live entries over.
+EXPIRES_PREFIX = "__expires__/"
+EXPIRES_KEY = "__expires__"
+
+
+def expiry_key(key):
+    return f"{EXPIRES_PREFIX}{key}"
+
+
+def is_expiry_key(key):
+    return isinstance(key, str) and (key == EXPIRES_KEY or key.startswith(EXPIRES_PREFIX))
+
+
+def value_hash(value):
+    """Short hash tying an expiry entry to the value it was set with."""
+    return hashlib.sha1(fingerprint(value).encode("utf-8")).hexdigest()[:12]
+
+
+def expiry_entry(values, key):
+    """The [expires_at, value_hash] entry of `key` in raw values, or None."""
+    entry = values.get(expiry_key(key))
+    if entry is None:
+        legacy = values.get(EXPIRES_KEY)
+        entry = legacy.get(key) if isinstance(legacy, dict) else None
+    return entry
+
+
+def is_expired(key, value, entry, now=None):
+    """
+    True if `key` (currently holding `value`) is past its expiry `entry`.
+
+    An entry only applies while the key still holds the value it was set
+    with, so a later plain `set()` (without ttl) cancels the expiry without
+    reading or rewriting the entry.
+    """
+    if not entry or value is None:
+        return False
+    expires_at, digest = entry
+    now = time.time() if now is None else now
+    return expires_at <= now and value_hash(value) == digest
+
+
+def _entry_keys(values):
+    keys = {k[len(EXPIRES_PREFIX):] for k, v in values.items()
+            if v is not None and isinstance(k, str) and k.startswith(EXPIRES_PREFIX)}
+    legacy = values.get(EXPIRES_KEY)
+    if isinstance(legacy, dict):
+        keys.update(legacy)
+    return keys
+
+
+def expired_keys(values, now=None):
+    """Keys of `values` whose TTL has passed."""
+    if not isinstance(values, dict):
+        return []
+    now = time.time() if now is None else now
+    return [key for key in _entry_keys(values)
+            if key in values and is_expired(key, values[key], expiry_entry(values, key), now)]
+
+
+def visible(values, now=None):
+    """
+    Values as readers see them: without expired keys, expiry entries and
+    null tombstones (thread state cannot drop keys, so deleting one sets it to None).
+    """
+    if not isinstance(values, dict):
+        return values
+    hidden = set(expired_keys(values, now))
+    if not hidden and not any(v is None or is_expiry_key(k) for k, v in values.items()):
+        return values
+    return {k: v for k, v in values.items() if v is not None and k not in hidden and not is_expiry_key(k)}
+
+
+def expiry_entries(data, ttl, now=None):
+    """Expiry entries to write along with `data` so its keys expire in `ttl` seconds."""
+    now = time.time() if now is None else now
+    return {expiry_key(key): [now + ttl, value_hash(value)] for key, value in data.items()}
+
+
+def live_entries(values, keys, now=None):
+    """Expiry entries still pending for `keys` (used to carry TTLs over when copying values)."""
+    now = time.time() if now is None else now
+    entries = {}
+    for key in keys:
+        entry = expiry_entry(values, key)
+        if entry and _applies(values.get(key), entry, now):
+            entries[expiry_key(key)] = entry
+    return entries
+
+
+def stale_entries(values, now=None):
+    """
+    Changes clearing expiry entries that no longer apply (the key expired,
+    was rewritten or deleted) and moving live entries out of the legacy map.
+    """
+    now = time.time() if now is None else now
+    changes = {}
+    for k, entry in values.items():
+        if entry is not None and isinstance(k, str) and k.startswith(EXPIRES_PREFIX):
+            if not _applies(values.get(k[len(EXPIRES_PREFIX):]), entry, now):
+                changes[k] = None
+    legacy = values.get(EXPIRES_KEY)
+    if legacy is not None:
+        changes[EXPIRES_KEY] = None
+        for key, entry in (legacy if isinstance(legacy, dict) else {}).items():
+            if values.get(expiry_key(key)) is None and _applies(values.get(key), entry, now):
+                changes[expiry_key(key)] = entry
+    return changes
+
+
+def _applies(value, entry, now):
+    expires_at, digest = entry
+    return value is not None and expires_at > now and value_hash(value) == digest
+
+
+class TTLSweeper:
+    """
+    Background thread removing expired keys from a set of threads every
+    `interval` seconds, with one bulk write per thread that has expired keys.
+    """
+    def __init__(self, db, project_id, thread_ids, interval=60.0):
+        self.db = db
+        self.project_id = project_id
+        self.thread_ids = list(thread_ids)
+        self.interval = interval
+        self.errors = []
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="epsimo-ttl-sweeper", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+        return False
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            for thread_id in self.thread_ids:
+                try:
+                    self.db.sweep(self.project_id, thread_id)
+                except Exception as e:
+                    self.errors.append((thread_id, e))
+                    self.db.client.metrics.incr("db.ttl.sweep_errors")
@@ -0,0 +1,175 @@
+import heapq
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .crdt import merge_crdts
+from .state import fingerprint
+from .ttl import visible
+
+
+class Watcher:
+    """
+    Change feed over the values of one or more threads.
+
+    Iterating yields one event per detected change:
+        {"thread_id", "changes": {key: new_value}, "removed": [keys],
+         "source": "stream" | "poll", "timestamp"}
+
+    While a run streamed through this client is active on a watched thread,
+    its `values` chunks are diffed directly and polling of that thread is
+    paused. Otherwise threads are polled with If-None-Match (an unchanged
+    thread costs an empty 304) on an adaptive schedule: the interval resets to
+    `min_interval` after a change and backs off up to `max_interval` while the
+    thread is idle. All threads are multiplexed on one loop and a small pool.
+    A thread whose poll fails (network error, 5xx) is retried with a doubled
+    interval and its error kept in `errors`; the other threads are unaffected.
+    """
+    def __init__(self, db, project_id, thread_ids, keys=None, min_interval=1.0, max_interval=30.0,
+                 concurrency=8, initial=False):
+        self.db = db
+        self.project_id = project_id
+        self.thread_ids = list(thread_ids)
+        self.keys = set(keys) if keys else None
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.concurrency = concurrency
+        self.initial = initial
+        self._snapshots = {}
+        self._etags = {}
+        self._intervals = {tid: min_interval for tid in self.thread_ids}
+        self._streaming = set()
+        self._inbox = queue.Queue()
+        self._wakeup = threading.Event()
+        self._closed = False
+        self.errors = {}  # thread_id -> last polling error, cleared by a successful poll
+
+    def __iter__(self):
+        return self.events()
+
+    def events(self, timeout=None):
+        """
+        Yield change events until `close()` is called or `timeout` seconds pass.
+        """
+        watched = set(self.thread_ids)
+
+        def listener(thread_id, values):
+            if thread_id in watched:
+                self._inbox.put((thread_id, values))
+                self._wakeup.set()
+
+        threads = self.db.client.threads
+        threads.subscribe_values(listener)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        schedule = [(0.0, tid) for tid in self.thread_ids]
+        heapq.heapify(schedule)
+
+        try:
+            with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+                while not self._closed:
+                    # 1. Values pushed by active runs
+                    for event in self._drain_inbox():
+                        yield event
+
+                    # 2. Poll the threads that are due
+                    now = time.monotonic()
+                    due = []
+                    while schedule and schedule[0][0] <= now:
+                        due.append(heapq.heappop(schedule)[1])
+                    polled = list(pool.map(self._safe_poll, [t for t in due if t not in self._streaming]))
+                    for thread_id, event, failed in polled:
+                        if failed:
+                            # Keep the feed going; retry this thread later, backing off.
+                            self._intervals[thread_id] = min(self.max_interval, self._intervals[thread_id] * 2)
+                        elif event is not None:
+                            self._intervals[thread_id] = self.min_interval
+                            yield event
+                        else:
+                            self._intervals[thread_id] = min(self.max_interval, self._intervals[thread_id] * 1.5)
+                    for thread_id in due:
+                        heapq.heappush(schedule, (time.monotonic() + self._intervals[thread_id], thread_id))
+
+                    # 3. Sleep until the next poll or a streamed value
+                    if deadline is not None and time.monotonic() >= deadline:
+                        return
+                    wait = schedule[0][0] - time.monotonic() if schedule else self.max_interval
+                    if deadline is not None:
+                        wait = min(wait, deadline - time.monotonic())
+                    self._wakeup.wait(max(0.0, wait))
+                    self._wakeup.clear()
+        finally:
+            threads.unsubscribe_values(listener)
+
+    def close(self):
+        """Stop the feed after the current iteration."""
+        self._closed = True
+        self._wakeup.set()
+
+    # --- Internals ---
+
+    def _drain_inbox(self):
+        while True:
+            try:
+                thread_id, values = self._inbox.get_nowait()
+            except queue.Empty:
+                return
+            if values is None:
+                # Run finished: resume polling quickly to pick up the final state.
+                self._streaming.discard(thread_id)
+                self._intervals[thread_id] = self.min_interval
+                continue
+            self._streaming.add(thread_id)
+            event = self._diff(thread_id, values, "stream")
+            if event is not None:
+                yield event
+
+    def _safe_poll(self, thread_id):
+        try:
+            thread_id, event = self._poll(thread_id)
+        except Exception as e:
+            self.errors[thread_id] = e
+            self.db.client.metrics.incr("db.watch.errors")
+            return thread_id, None, True
+        self.errors.pop(thread_id, None)
+        return thread_id, event, False
+
+    def _poll(self, thread_id):
+        threads = self.db.client.threads
+        state, etag = threads.get_state_if_changed(self.project_id, thread_id, etag=self._etags.get(thread_id))
+        self.db.client.metrics.incr("db.watch.polls")
+        if state is None:
+            self.db.client.metrics.incr("db.watch.not_modified")
+            return thread_id, None
+        self._etags[thread_id] = etag
+        if self.db.cache is not None:
+            self.db.cache.store(thread_id, state, etag=etag)
+        values = state.get("values")
+        return thread_id, self._diff(thread_id, values if isinstance(values, dict) else {}, "poll")
+
+    def _diff(self, thread_id, values, source):
+        decoded = self.db.decode_values(values)
+        if self.db.history is not None:
+            self.db.history.record(thread_id, decoded)
+        # Diff what `get_all()` returns: CRDTs merged, no expired keys, tombstones or bookkeeping keys.
+        view = merge_crdts(visible(decoded))
+        if self.keys is not None:
+            view = {k: v for k, v in view.items() if k in self.keys}
+        current = {k: fingerprint(v) for k, v in view.items()}
+        previous = self._snapshots.get(thread_id)
+        self._snapshots[thread_id] = current
+        if previous is None and not self.initial:
+            return None
+        previous = previous or {}
+        changes = {k: view[k] for k, fp in current.items() if previous.get(k) != fp}
+        removed = [k for k in previous if k not in current]
+        if not changes and not removed:
+            return None
+        self.db.client.metrics.incr("db.watch.events")
+        return {
+            "thread_id": thread_id,
+            "changes": changes,
+            "removed": removed,
+            "source": source,
+            "timestamp": time.time(),
+        }
@@ -0,0 +1,103 @@
+import sys
+import os
+import hashlib
+import tempfile
+
+# Add parent dir to path to find epsimo package
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from epsimo import EpsimoClient
+from upload_server import UploadServer
+
+CHUNK = 64 * 1024
+
+
+class Interrupted(Exception):
+    pass
+
+
+def make_file(directory, size):
+    path = os.path.join(directory, "payload.bin")
+    with open(path, "wb") as f:
+        f.write(os.urandom(size))
+    with open(path, "rb") as f:
+        return path, hashlib.sha256(f.read()).hexdigest()
+
+
+def check(label, condition):
+    print(f"{'✅' if condition else '❌'} {label}")
+    return condition
+
+
+def test_resume(workdir):
+    print("🧪 Interrupted upload resumes from the saved chunks...")
+    server = UploadServer().start()
+    try:
+        client = EpsimoClient(api_key="local", base_url=server.url)
+        path, digest = make_file(workdir, 10 * CHUNK + 123)  # 11 chunks
+        state_dir = os.path.join(workdir, "uploads")
+
+        def stop_after_four(sent, total):
+            if sent >= 4 * CHUNK:
+                raise Interrupted()
+
+        try:
+            client.files.upload_resumable("p", "a", path, chunk_size=CHUNK, state_dir=state_dir,
+                                          on_progress=stop_after_four)
+        except Interrupted:
+            pass
+        first = server.chunk_puts
+        result = client.files.upload_resumable("p", "a", path, chunk_size=CHUNK, state_dir=state_dir)
+        return all([
+            check(f"first attempt sent {first} chunks before the interruption", first == 4),
+            check(f"resume sent only the {server.chunk_puts - first} missing chunks", server.chunk_puts == 11),
+            check("file reassembled intact", result["sha256"] == digest),
+            check("local upload state cleared", not os.listdir(state_dir)),
+        ])
+    finally:
+        server.stop()
+
+
+def test_chunk_retry(workdir):
+    print("🧪 Failed chunks are retried individually...")
+    server = UploadServer(fail_every=3).start()
+    try:
+        client = EpsimoClient(api_key="local", base_url=server.url)
+        path, digest = make_file(workdir, 6 * CHUNK)
+        # Retries back off from 1s, so this check takes a few seconds.
+        client.files.upload_resumable("p", "a", path, chunk_size=CHUNK, retries=3,
+                                      state_dir=os.path.join(workdir, "uploads"))
+        stored = server.files[-1]
+        return all([
+            check(f"{client.metrics.get('files.upload.chunk_retries')} chunk retries",
+                  client.metrics.get("files.upload.chunk_retries") >= 2),
+            check("file reassembled intact", stored["sha256"] == digest and stored["method"] == "chunked"),
+        ])
+    finally:
+        server.stop()
+
+
+def test_fallback(workdir):
+    print("🧪 Servers without the chunked API get a single upload...")
+    server = UploadServer(chunked=False).start()
+    try:
+        client = EpsimoClient(api_key="local", base_url=server.url)
+        path, _ = make_file(workdir, 3 * CHUNK)
+        client.files.upload_resumable("p", "a", path, chunk_size=CHUNK, state_dir=os.path.join(workdir, "uploads"))
+        client.files.upload_resumable("p", "a", path, chunk_size=CHUNK, state_dir=os.path.join(workdir, "uploads"))
+        return all([
+            check("fell back to multipart uploads", [f["method"] for f in server.files] == ["single", "single"]),
+            check("chunked API probed only once", client.metrics.get("files.upload.single_shot_fallbacks") == 2
+                  and client.files._chunked_unsupported),
+        ])
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    results = []
+    for test in (test_resume, test_chunk_retry, test_fallback):
+        with tempfile.TemporaryDirectory() as workdir:
+            results.append(test(workdir))
+    print("\n🎉 All resumable upload checks passed." if all(results) else "\n❌ Some checks failed.")
+    sys.exit(0 if all(results) else 1)
@@ -0,0 +1,142 @@
+"""
+Local stand-in for the chunked upload API used by `Files.upload_resumable()`.
+
+The platform does not document a chunked upload endpoint yet; this server
+implements the protocol described in `epsimo/resumable.py` so resume, chunk
+retries and the single-shot fallback can be exercised without it:
+
+    python scripts/upload_server.py --port 8768 [--fail-every 3] [--no-chunks]
+
+    EPSIMO_API_URL=http://127.0.0.1:8768 python -c "..."
+
+Project tokens are answered by GET /projects/{id}; uploaded files are kept in
+memory and listed (with their sha256) by GET /assistants/{id}/files.
+"""
+import argparse
+import hashlib
+import http.server
+import itertools
+import json
+import threading
+
+
+class UploadServer(http.server.ThreadingHTTPServer):
+    """
+    In-memory upload server.
+
+    Args:
+        fail_every: Answer every Nth chunk PUT with a 503 (0 disables).
+        chunked: False to answer 404 to POST /uploads, like a server without
+            the chunked API (clients fall back to a single multipart upload).
+    """
+    daemon_threads = True
+
+    def __init__(self, address=("127.0.0.1", 0), fail_every=0, chunked=True):
+        super().__init__(address, _Handler)
+        self.fail_every = fail_every
+        self.chunked = chunked
+        self.sessions = {}
+        self.files = []
+        self.chunk_puts = 0
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    @property
+    def url(self):
+        return f"http://{self.server_address[0]}:{self.server_address[1]}"
+
+    def start(self):
+        """Serve from a background thread; returns self."""
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        parts = self.path.strip("/").split("/")
+        if parts[0] == "projects":
+            return self._send(200, {"access_token": "local-token"})
+        if parts[-1] == "files":
+            return self._send(200, self.server.files)
+        if len(parts) == 4 and parts[2] == "uploads":
+            session = self.server.sessions.get(parts[3])
+            if session is None:
+                return self._send(404, {"detail": "Upload not found"})
+            return self._send(200, {"received": sorted(session["chunks"])})
+        self._send(404, {"detail": "Not Found"})
+
+    def do_PUT(self):
+        # /assistants/{aid}/uploads/{uid}/chunks/{i}
+        parts = self.path.strip("/").split("/")
+        data = self._body()
+        session = self.server.sessions.get(parts[3]) if len(parts) == 6 else None
+        if session is None:
+            return self._send(404, {"detail": "Upload not found"})
+        with self.server._lock:
+            self.server.chunk_puts += 1
+            failing = self.server.fail_every and self.server.chunk_puts % self.server.fail_every == 0
+        if failing:
+            return self._send(503, {"detail": "Temporarily unavailable"})
+        session["chunks"][int(parts[5])] = data
+        self._send(200, {"received": len(data)})
+
+    def do_POST(self):
+        parts = self.path.strip("/").split("/")
+        data = self._body()
+        if parts[-1] == "uploads":
+            if not self.server.chunked:
+                return self._send(404, {"detail": "Not Found"})
+            upload_id = f"up{next(self.server._ids)}"
+            self.server.sessions[upload_id] = {"meta": json.loads(data), "chunks": {}}
+            return self._send(200, {"upload_id": upload_id})
+        if parts[-1] == "complete":
+            session = self.server.sessions.pop(parts[3], None)
+            if session is None:
+                return self._send(404, {"detail": "Upload not found"})
+            blob = b"".join(session["chunks"][i] for i in sorted(session["chunks"]))
+            return self._send(200, self._store(session["meta"]["filename"], blob, "chunked"))
+        if parts[-1] == "files":
+            # Single-shot multipart upload; the whole body stands in for the file.
+            return self._send(200, [self._store("multipart", data, "single")])
+        self._send(404, {"detail": "Not Found"})
+
+    def _store(self, name, blob, method):
+        entry = {"file_id": f"file{len(self.server.files) + 1}", "filename": name, "size": len(blob),
+                 "sha256": hashlib.sha256(blob).hexdigest(), "method": method}
+        self.server.files.append(entry)
+        return entry
+
+    def _body(self):
+        return self.rfile.read(int(self.headers.get("Content-Length") or 0))
+
+    def _send(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for the chunked upload API")
+    parser.add_argument("--port", type=int, default=8768)
+    parser.add_argument("--fail-every", type=int, default=0, help="Answer every Nth chunk with a 503")
+    parser.add_argument("--no-chunks", action="store_true", help="Behave like a server without chunked uploads")
+    args = parser.parse_args()
+    server = UploadServer(("127.0.0.1", args.port), fail_every=args.fail_every, chunked=not args.no_chunks)
+    print(f"📡 Upload stand-in listening on {server.url}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()